@@ -0,0 +1,86 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+STEPS = (
+    "Run `echo <name> {i}`.",
+    "Create folder `<root>/folder{i}`.",
+    "Copy `<root>/file{i}` to `<root>/copy{i}`.",
+    "Add the following content to file `file{i}.txt`:",
+    "Install `pkg{i} <name>-tools`.",
+    "Go to `<root>`.",
+)
+
+PAYLOAD = (
+    "```",
+    "<name> = {i}",
+    "root = <root>",
+    "```",
+)
+
+PLACEHOLDERS = ["name=buildok", "root=/tmp/buildok_bench"]
+
+
+def topic_title(number):
+    """Title of a synthetic topic.
+
+    Args:
+        number (int): Topic number.
+
+    Returns:
+        str: Topic title.
+    """
+
+    return "stage %d" % number
+
+
+def generate_guide(steps, topics=None):
+    """Generate a synthetic guide.
+
+    Steps cycle through shell commands, folders, copies, file edits with
+    payload and installs, all with placeholders. Every topic but the first
+    starts by invoking another topic, so invokes nest in a tree.
+
+    Args:
+        steps  (int): Number of steps in guide.
+        topics (int): Number of topics; defaults to one per hundred steps.
+
+    Returns:
+        str: Guide content.
+    """
+
+    if topics is None:
+        topics = max(1, steps // 100)
+    lines = ["# Synthetic guide", ""]
+    per_topic, extra = divmod(steps, topics)
+    i = 0
+    for number in range(topics):
+        lines.extend(["## How to %s" % topic_title(number), ""])
+        count = per_topic + (1 if number < extra else 0)
+        for position in range(count):
+            if position == 0 and number > 0:
+                parent = topic_title((number - 1) // 2)
+                lines.append("1) Follow steps from `%s`." % parent)
+                continue
+            template = STEPS[i % len(STEPS)]
+            lines.append("%d) %s" % (position + 1, template.format(i=i)))
+            if template.endswith(":"):
+                lines.extend(line.format(i=i) for line in PAYLOAD)
+            i += 1
+        lines.append("")
+    return "\n".join(lines) + "\n"
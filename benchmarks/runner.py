@@ -0,0 +1,330 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+from __future__ import print_function
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from platform import platform, python_version
+from time import time
+from timeit import default_timer
+
+from buildok import __build__
+from buildok.version import __version__
+from buildok.matcher import Matcher
+from buildok.placeholder import Placeholder
+from buildok.reader import Reader
+from buildok.report import Report
+from buildok.script import Script
+from buildok.statement import Statement
+
+from buildok.readers.read_me import ReadmeReader
+from buildok.structures.guide import Guide
+from buildok.structures.topic import Topic
+from buildok.util import state
+from buildok.util.shell import Shell
+
+from benchmarks.guides import generate_guide, PLACEHOLDERS
+
+
+SIZES = (10, 1000, 100000)
+
+LOOKUP_STEPS = (
+    "Run `echo buildok 1`",
+    "Create folder `/tmp/buildok_bench/folder1`",
+    "Copy `/tmp/buildok_bench/file1` to `/tmp/buildok_bench/copy1`",
+    "Add the following content to file `file1.txt`",
+    "Install `pkg1 buildok-tools`",
+    "Go to `/tmp/buildok_bench`",
+    "Follow steps from `stage 0`",
+    "Remove folder `/tmp/buildok_bench/copy1`",
+    "Make symlink `/tmp/buildok_bench/file1` to `/tmp/buildok_bench/link1`",
+    "Set permissions to `755` for `/tmp/buildok_bench/folder1`",
+    "Stop process `buildok`",
+    "Compile the code and ship it",
+)
+
+LOOKUP_ROUNDS = 1000
+
+
+def measure(func, repeat, setup=None):
+    """Time a function a few times.
+
+    Args:
+        func (callable): Function to time, called with result of setup.
+        repeat    (int): Number of runs.
+        setup (callable): Called before each run, not timed.
+
+    Returns:
+        list: Duration of each run in seconds.
+    """
+
+    durations = []
+    for _ in range(repeat):
+        context = setup() if setup is not None else None
+        started = default_timer()
+        func(context)
+        durations.append(default_timer() - started)
+    return durations
+
+
+def summary(name, durations, steps=None, topics=None):
+    """Summarize durations of a benchmark.
+
+    Args:
+        name       (str): Benchmark name.
+        durations (list): Duration of each run in seconds.
+        steps      (int): Number of steps in guide.
+        topics     (int): Number of topics in guide.
+
+    Returns:
+        dict: Benchmark result.
+    """
+
+    ordered = sorted(durations)
+    result = {
+        "name": name,
+        "steps": steps,
+        "topics": topics,
+        "repeat": len(durations),
+        "min": ordered[0],
+        "median": ordered[len(ordered) // 2],
+        "max": ordered[-1],
+    }
+    if steps:
+        result.update({"us_per_step": ordered[0] / steps * 1e6})
+    return result
+
+
+def forget():
+    """Drop topics and guides kept by previous runs.
+    """
+
+    Topic.forget_all_topics()
+    Guide.forget_all_guides()
+
+
+def new_reader():
+    """Create reader of current guide.
+
+    Returns:
+        ReadmeReader: Reader instance.
+    """
+
+    forget()
+    return ReadmeReader(validate=True)
+
+
+def parsed_reader():
+    """Create reader of current guide, with guide read.
+
+    Returns:
+        ReadmeReader: Reader instance.
+    """
+
+    reader = new_reader()
+    reader.read()
+    return reader
+
+
+def fake_run(filepath):
+    """Parse guide and fake run all topics, as the command line does.
+
+    Args:
+        filepath (str): Path to guide.
+    """
+
+    args = Shell.parse(["-g", filepath, "--all", "--fake-run", "--no-cache",
+                        "--no-history"])
+    Report.reset()
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        script = Script(args)
+        script.setup()
+        script.parse().run()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def bench_prepare(repeat):
+    """Benchmark statements setup, with and without manifest.
+
+    Args:
+        repeat (int): Number of runs.
+
+    Returns:
+        list: Benchmark results.
+    """
+
+    def cold():
+        manifest = state.state_path(Statement.manifest_file)
+        if os.path.isfile(manifest):
+            os.remove(manifest)
+        Statement.expressions.clear()
+
+    def warm():
+        Statement.expressions.clear()
+
+    def prepare(_):
+        Statement.prepare()
+
+    return [
+        summary("Statement.prepare (cold)", measure(prepare, repeat, cold)),
+        summary("Statement.prepare (warm)", measure(prepare, repeat, warm)),
+    ]
+
+
+def bench_lookup(repeat):
+    """Benchmark matching steps against statements, old loop vs dispatcher.
+
+    The loop tries every compiled statement in turn, as matching did before
+    statements were indexed by their leading keyword. The last sample step
+    matches no statement, which is the worst case of both.
+
+    Args:
+        repeat (int): Number of runs.
+
+    Returns:
+        list: Benchmark results.
+    """
+
+    Statement.prepare()
+    statements = list(Statement.get_statements())
+    steps = LOOKUP_STEPS * LOOKUP_ROUNDS
+
+    def loop(_):
+        for step in steps:
+            for exp, _ in statements:
+                if exp.match(step) is not None:
+                    break
+
+    def dispatch(_):
+        for step in steps:
+            Statement.lookup(step)
+
+    meta = {"steps": len(steps)}
+    results = [
+        summary("Statement loop", measure(loop, repeat), **meta),
+        summary("Statement.lookup", measure(dispatch, repeat), **meta),
+    ]
+    results[1].update({"speedup": results[0]["min"] / results[1]["min"]})
+    return results
+
+
+def bench_guide(folder, steps, repeat):
+    """Benchmark reading, parsing, pairing and fake running a guide.
+
+    Args:
+        folder (str): Folder to write guide in.
+        steps  (int): Number of steps in guide.
+        repeat (int): Number of runs.
+
+    Returns:
+        list: Benchmark results.
+    """
+
+    content = generate_guide(steps)
+    filepath = os.path.join(folder, "README-%d.md" % steps)
+    with open(filepath, "w") as file_:
+        file_.write(content)
+    Reader.set_project_path(filepath)
+    Placeholder.reset()
+    Placeholder.config(list(PLACEHOLDERS))
+
+    reader = parsed_reader()
+    reader.parse()
+    topics = reader.get_guide().get_topics()
+    instructions = [s for t in topics for s in t.get_steps() or []]
+    lines = content.split("\n")
+
+    def read(reader):
+        reader.read()
+
+    def parse(reader):
+        reader.parse()
+
+    def pair(_):
+        Statement.expressions.clear()
+        Matcher.pair_all(instructions)
+
+    def scan(_):
+        Placeholder.parse_list(lines)
+
+    def run(_):
+        forget()
+        fake_run(filepath)
+
+    meta = {"steps": steps, "topics": len(topics)}
+    results = [
+        summary("Reader.read", measure(read, repeat, new_reader), **meta),
+        summary("ReadmeReader.parse", measure(parse, repeat, parsed_reader),
+                **meta),
+        summary("Matcher.pair_all", measure(pair, repeat), **meta),
+        summary("Placeholder.parse_list", measure(scan, repeat), **meta),
+        summary("Fake run", measure(run, repeat), **meta),
+    ]
+    forget()
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark buildok hot paths")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated number of steps of guides")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs of each benchmark")
+    parser.add_argument("--output", help="save results to file")
+    args = parser.parse_args()
+
+    # Keep state of benchmarks away from working directory
+    folder = tempfile.mkdtemp(prefix="buildok-bench-")
+    state.set_working_dir(folder)
+    logging.disable(logging.WARNING)
+
+    try:
+        results = bench_prepare(args.repeat)
+        results.extend(bench_lookup(args.repeat))
+        for steps in [int(s) for s in args.sizes.split(",")]:
+            print("Benchmarking guide of %d steps..." % steps,
+                  file=sys.stderr)
+            results.extend(bench_guide(folder, steps, args.repeat))
+    finally:
+        shutil.rmtree(folder)
+
+    data = {
+        "version": __version__,
+        "build": __build__,
+        "python": python_version(),
+        "platform": platform(),
+        "timestamp": time(),
+        "results": results,
+    }
+    output = json.dumps(data, indent=1, sort_keys=True)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as file_:
+            file_.write(output + "\n")
@@ -27,9 +27,13 @@ class Action(object):
     Arguments:
         header (str): Lookup docstring header.
         env (Sysenv): System environment instance.
+        lock   (str): Name of a shared resource used exclusively (e.g. the
+                      package manager), or None.
+        cacheable (bool): Steps may be skipped in incremental mode.
 
     Args:
         output  (str): Output status message.
+        output_path (str): Path to full output, if it was saved to file.
         failed (bool): Handler failture status.
         payload (str): Handler payload input message.
 
@@ -38,11 +42,14 @@ class Action(object):
     """
 
     env = None
+    lock = None
+    cacheable = True
     doc_header = r"accepted statements"
 
     def __init__(self, payload=None):
         self.payload = payload
         self.output = ""
+        self.output_path = None
         self.failed = None
 
     @classmethod
@@ -84,6 +91,24 @@ class Action(object):
 
         self.output = message
 
+    def get_output_path(self):
+        """Full output path getter.
+
+        Returns:
+            str: Path to full output or None.
+        """
+
+        return self.output_path
+
+    def set_output_path(self, filepath):
+        """Full output path setter.
+
+        Args:
+            filepath (str): Path to full output.
+        """
+
+        self.output_path = filepath
+
     def get_payload(self):
         """Payload getter.
 
@@ -169,6 +194,44 @@ class Action(object):
 
         raise NotImplementedError("Class must implement this method")
 
+    @classmethod
+    def resources(cls, *args, **kwargs):
+        """Paths touched by an action handler.
+
+        Called with the same arguments as `run`. Used to decide which steps
+        may run in parallel. Handlers touching unknown resources return None
+        and always run alone.
+
+        Returns:
+            mixt: List of paths or None if unknown.
+        """
+
+        return None
+
+    @classmethod
+    def is_cacheable(cls):
+        """Check whetever steps may be skipped in incremental mode.
+
+        Returns:
+            bool: True if steps are skipped when unchanged.
+        """
+
+        return cls.cacheable
+
+    @classmethod
+    def batch(cls, batch):
+        """Merge arguments of consecutive steps into a single step.
+
+        Args:
+            batch (list): Keyword arguments of each consecutive step.
+
+        Returns:
+            mixt: Keyword arguments of merged step or None if steps of this
+                  action handler cannot be merged.
+        """
+
+        return None
+
     @classmethod
     def parse_description(cls, fallback_msg="No description"):
         """Action handler description.
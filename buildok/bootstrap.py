@@ -24,6 +24,8 @@ from os import environ
 
 from buildok.version import __version__
 
+from buildok.daemon import Daemon
+from buildok.history import History
 from buildok.statement import Statement
 from buildok.script import Script
 from buildok.action import Action
@@ -35,6 +37,7 @@ from buildok.util.analyze import self_analyze, analyze, crash
 from buildok.util.locker import lock, unlock
 from buildok.util.lookup import scan_lookup
 from buildok.util.sysenv import Sysenv
+from buildok.util.trace import Trace
 from buildok.util.log import Log
 
 
@@ -43,8 +46,19 @@ def main(error=None):
     # Parse command line args
     args = Shell.parse()
 
+    # Send run to daemon and exit
+    if args.client:
+        Log.configure(verbose=args.verbose)
+        return Daemon.request(args)
+
+    # Record timeline of run
+    if args.trace is not None and not args.serve:
+        Trace.enable()
+
     # System setup
+    started = Trace.start()
     Sysenv.setup(__version__, args)
+    Trace.finish(started, "Sysenv.setup", "setup")
 
     # Check version and exit
     if args.version:
@@ -59,8 +73,14 @@ def main(error=None):
     # Set console verbose level
     Console.verbose = args.verbose
 
+    # Show duration trends of steps and exit
+    if args.history:
+        return History.output(args.topic)
+
     # Prepare all statements
+    started = Trace.start()
     Statement.prepare()
+    Trace.finish(started, "Statement.prepare", "setup")
 
     # Lookup statement and example usage
     if args.lookup is not None:
@@ -79,6 +99,10 @@ def main(error=None):
     # Attach system environment to all actions
     Action.set_env(Sysenv)
 
+    # Serve runs until interrupted
+    if args.serve:
+        return Daemon.serve(args)
+
     # Initialize script and run all steps
     guide_script = Script(args)
     guide_script.setup()
@@ -100,6 +124,9 @@ def main(error=None):
     # Display report
     guide_script.print_report()
 
+    # Save timeline of run
+    Trace.save(args.trace)
+
     # Throw any errors found...
     if environ.get("DEBUG") is not None and error is not None:
         raise Console.fatal(error)
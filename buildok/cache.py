@@ -0,0 +1,192 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+
+from collections import OrderedDict
+from hashlib import sha1
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from buildok.version import __version__
+from buildok import __build__
+
+from buildok.util.state import state_path
+from buildok.util.log import Log
+
+
+class Cache(object):
+    """Persistent cache of parsed guides.
+
+    Stores the fully parsed guide (topics and paired instructions) on disk so
+    a warm start can skip reading, scanning and pairing. Each entry is keyed
+    by the guide content hash, placeholders and buildok version.
+
+    Long running processes (e.g. daemon mode) can also keep recently used
+    guides in memory, skipping unpickling as well.
+
+    Attributes:
+        enabled (bool): Toggle cache lookups and writes.
+        folder   (str): Cache folder name inside state directory.
+        revision (int): Format of cached structures; bump on changes.
+        memory  (dict): Guides kept in memory or None if disabled.
+        limit    (int): Maximum number of guides kept in memory.
+    """
+
+    enabled = True
+    folder = r"cache"
+    revision = 2
+    memory = None
+    limit = 16
+
+    @classmethod
+    def keep_in_memory(cls, limit=None):
+        """Keep recently used guides in memory.
+
+        Args:
+            limit (int): Maximum number of guides kept in memory.
+        """
+
+        cls.memory = OrderedDict()
+        if limit is not None:
+            cls.limit = limit
+
+    @classmethod
+    def remember(cls, key, guide):
+        """Store guide in memory, dropping the least recently used.
+
+        Args:
+            key     (str): Cache key.
+            guide (Guide): Parsed guide instance.
+        """
+
+        if cls.memory is None:
+            return
+        cls.memory.pop(key, None)
+        cls.memory[key] = guide
+        while len(cls.memory) > cls.limit:
+            cls.memory.popitem(last=False)
+
+    @classmethod
+    def digest(cls, filepath, *extra):
+        """Compute cache key for a guide.
+
+        Args:
+            filepath (str): Path to guide file.
+            extra   (list): Additional values altering the parsed guide.
+
+        Returns:
+            str: Hexadecimal key.
+        """
+
+        hasher = sha1()
+        with open(filepath, "rb") as file_:
+            for chunk in iter(lambda: file_.read(1 << 16), b""):
+                hasher.update(chunk)
+        hasher.update(__version__)
+        hasher.update(__build__)
+        hasher.update(str(cls.revision))
+        for value in extra:
+            hasher.update(repr(value))
+        return hasher.hexdigest()
+
+    @classmethod
+    def get_filepath(cls, key):
+        """Get cache file path of a key.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            str: Path to cache file.
+
+        Raises:
+            OSError: If cache folder cannot be created.
+        """
+
+        return state_path(cls.folder, "%s.pickle" % key)
+
+    @classmethod
+    def load(cls, key):
+        """Load cached guide.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            mixt: Guide instance if cached, otherwise None.
+        """
+
+        if not cls.enabled:
+            return None
+        if cls.memory is not None and key in cls.memory:
+            guide = cls.memory[key]
+            cls.remember(key, guide)
+            Log.debug("Loaded guide from memory %s" % key)
+            return guide
+        try:
+            filepath = cls.get_filepath(key)
+        except OSError as e:
+            Log.debug("Cannot read cache: %s" % e)
+            return None
+        if not os.path.isfile(filepath):
+            return None
+        try:
+            with open(filepath, "rb") as file_:
+                guide = pickle.load(file_)
+            Log.debug("Loaded cached guide %s" % filepath)
+            cls.remember(key, guide)
+            return guide
+        except Exception as e:
+            Log.warn("Ignoring broken cache %s: %s" % (filepath, e))
+        return None
+
+    @classmethod
+    def save(cls, key, guide):
+        """Save parsed guide to cache.
+
+        Cache is written to a temporary file first and renamed afterwards, so
+        concurrent runs never read a partial entry.
+
+        Args:
+            key     (str): Cache key.
+            guide (Guide): Parsed guide instance.
+        """
+
+        if not cls.enabled:
+            return
+        cls.remember(key, guide)
+        try:
+            filepath = cls.get_filepath(key)
+        except OSError as e:
+            return Log.warn("Cannot save guide to cache: %s" % e)
+        tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+        try:
+            with open(tmp_filepath, "wb") as file_:
+                pickle.dump(guide, file_, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filepath, filepath)
+            Log.debug("Saved guide to cache %s" % filepath)
+        except Exception as e:
+            Log.warn("Cannot save guide to cache: %s" % e)
+            if os.path.isfile(tmp_filepath):
+                os.remove(tmp_filepath)
@@ -0,0 +1,128 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import json
+import os
+
+from buildok.util.state import state_path
+from buildok.util.log import Log
+
+
+class Checkpoint(object):
+    """Progress of a topic run, saved after each successful step.
+
+    A failed run leaves its checkpoint behind, so the next run can resume
+    the topic from the step that failed, in the working directory it was
+    left in. A run that ends with no errors removes the checkpoint.
+
+    Checkpoints are appended as JSON lines to a file kept open for the whole
+    run, so saving one costs a single write; the last complete line wins.
+
+    Attributes:
+        state_file (str): Checkpoint file name inside state directory.
+        file      (file): Open checkpoint file of current run.
+    """
+
+    state_file = r"checkpoint.log"
+    file = None
+
+    @classmethod
+    def save(cls, topic, step, total, guide):
+        """Save checkpoint.
+
+        The first checkpoint of a run replaces any older one.
+
+        Args:
+            topic (str): Title of running topic.
+            step  (int): Index of next step to run.
+            total (int): Number of steps in topic.
+            guide (str): Hash of guide.
+        """
+
+        data = {
+            "topic": topic,
+            "step": step,
+            "total": total,
+            "guide": guide,
+            "cwd": os.getcwd(),
+        }
+        try:
+            if cls.file is None:
+                cls.file = open(state_path(cls.state_file), "w")
+            cls.file.write(json.dumps(data, sort_keys=True) + "\n")
+            cls.file.flush()
+        except Exception as e:
+            Log.debug("Cannot save checkpoint: %s" % e)
+
+    @classmethod
+    def load(cls, guide):
+        """Load checkpoint of a guide.
+
+        Args:
+            guide (str): Hash of guide.
+
+        Returns:
+            mixt: Checkpoint data or None if missing or made for another
+                  version of guide.
+        """
+
+        data = None
+        try:
+            filepath = state_path(cls.state_file)
+            if not os.path.isfile(filepath):
+                return None
+            with open(filepath, "r") as file_:
+                lines = file_.readlines()
+        except (IOError, OSError) as e:
+            Log.debug("Cannot read checkpoint: %s" % e)
+            return None
+        for line in lines:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                Log.debug("Ignoring broken checkpoint: %s" % line)
+        if data is None:
+            return None
+        if data.get("guide") != guide:
+            Log.warn("Guide has changed since last checkpoint, ignoring it")
+            return None
+        return data
+
+    @classmethod
+    def close(cls):
+        """Close checkpoint file of current run.
+        """
+
+        if cls.file is not None:
+            cls.file.close()
+            cls.file = None
+
+    @classmethod
+    def clear(cls):
+        """Remove checkpoint.
+        """
+
+        cls.close()
+        try:
+            filepath = state_path(cls.state_file)
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+        except OSError as e:
+            Log.debug("Cannot remove checkpoint: %s" % e)
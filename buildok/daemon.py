@@ -0,0 +1,392 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+from __future__ import print_function
+
+import json
+import os
+import socket
+
+from argparse import Namespace
+from os import chdir, getcwd
+from signal import signal, SIGTERM
+
+from buildok.cache import Cache
+from buildok.placeholder import Placeholder
+from buildok.report import Report
+from buildok.script import Script
+from buildok.script import SUCCESS_LOG, FAILED_LOG, ERROR_LOG, CACHED_LOG
+from buildok.structures.guide import Guide
+from buildok.structures.topic import Topic
+
+from buildok.util.log import Log
+from buildok.util.packages import PackageIndex
+from buildok.util.state import state_path, set_working_dir
+
+
+class Daemon(object):
+    """Serve guide runs over a local Unix socket.
+
+    Statements, system environment and parsed guides stay loaded between
+    runs, so a request only pays for running its steps. Requests are served
+    one at a time, since running a topic changes the working directory of
+    the whole process. Every run uses the shell arguments of the daemon.
+
+    A request is a single line of JSON:
+
+        {"guide": "/path/README.md", "cwd": "/path", "topics": "build,test",
+         "all": false, "placeholders": ["key=value"]}
+
+    The response is a stream of JSON lines, one for each step that ran,
+    ending with the report of all topics.
+
+    Attributes:
+        socket_file (str): Socket file name inside state directory.
+        backlog     (int): Maximum number of pending connections.
+        args  (Namespace): Shell arguments of daemon.
+        server   (socket): Listening socket.
+        client   (socket): Connection of request being served.
+    """
+
+    socket_file = r"daemon.sock"
+    backlog = 16
+
+    args = None
+    server = None
+    client = None
+
+    @classmethod
+    def get_socket_path(cls, filepath=None):
+        """Get path to socket file.
+
+        Args:
+            filepath (str): Path to socket file; defaults to state directory.
+
+        Raises:
+            SystemExit: If state directory cannot be created.
+
+        Returns:
+            str: Absolute path to socket file.
+        """
+
+        if filepath is None:
+            try:
+                return state_path(cls.socket_file)
+            except OSError as e:
+                raise SystemExit("Cannot use state directory: %s" % e)
+        return os.path.abspath(filepath)
+
+    @classmethod
+    def serve(cls, args):
+        """Accept and run requests until interrupted or terminated.
+
+        Args:
+            args (Namespace): Shell arguments of daemon.
+        """
+
+        cls.args = args
+        filepath = cls.get_socket_path(args.socket)
+        cls.bind(filepath)
+        signal(SIGTERM, cls.stop)
+        Cache.keep_in_memory()
+        Log.info("Serving guide runs on %s" % filepath)
+        try:
+            while True:
+                conn, _ = cls.server.accept()
+                cls.handle(conn)
+        except KeyboardInterrupt:
+            print("")  # append newline after ^C
+        finally:
+            cls.server.close()
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            Log.info("Daemon stopped")
+
+    @staticmethod
+    def stop(signum, frame):
+        """Stop serving on SIGTERM.
+
+        Raises:
+            SystemExit: Always.
+        """
+
+        raise SystemExit("Received signal %d" % signum)
+
+    @classmethod
+    def bind(cls, filepath):
+        """Listen on socket file.
+
+        A socket file left behind by a dead daemon is removed. The socket is
+        accessible only by its owner.
+
+        Args:
+            filepath (str): Path to socket file.
+
+        Raises:
+            SystemExit: If another daemon is listening on socket file.
+        """
+
+        if os.path.exists(filepath):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(filepath)
+                raise SystemExit("Daemon already running on %s" % filepath)
+            except socket.error:
+                os.remove(filepath)
+            finally:
+                probe.close()
+        cls.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            cls.server.bind(filepath)
+        finally:
+            os.umask(umask)
+        cls.server.listen(cls.backlog)
+
+    @classmethod
+    def handle(cls, conn):
+        """Read a request from connection and run it.
+
+        Args:
+            conn (socket): Client connection.
+        """
+
+        cls.client = conn
+        reader = conn.makefile("rb")
+        try:
+            request = json.loads(reader.readline())
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            cls.run_request(request)
+        except Exception as e:
+            Log.error("Bad request: %s" % e)
+            cls.send({"event": "error", "message": str(e)})
+        finally:
+            cls.client = None
+            reader.close()
+            conn.close()
+
+    @classmethod
+    def run_request(cls, request):
+        """Run topics of request and send back the report.
+
+        Report, placeholders, known guides and topics and the package index
+        are reset before each run, so nothing from an earlier request leaks
+        into the next one. State is kept in the working directory of the
+        request, so projects never share checkpoints or history. The working
+        directory of the daemon is restored afterwards.
+
+        Args:
+            request (dict): Run request.
+        """
+
+        args = cls.get_args(request)
+        start_dir = getcwd()
+        work_dir = request.get("cwd") or start_dir
+        state_dir = set_working_dir(work_dir)
+        Report.reset()
+        Placeholder.reset()
+        Topic.forget_all_topics()
+        Guide.forget_all_guides()
+        PackageIndex.reset()
+        try:
+            chdir(work_dir)
+            Placeholder.config(args.placeholder)
+            script = Script(args)
+            script.on_step = cls.stream(script)
+            script.setup()
+            script.parse().run()
+        except Exception as e:
+            if str(e) != "" and Report.status == "n/a":
+                Report.set_status("Failed")
+                Report.set_error(str(e))
+        finally:
+            chdir(start_dir)
+            set_working_dir(state_dir)
+        if Report.topic != "n/a" or len(Report.records) == 0:
+            Report.archive()
+        records = []
+        for record in Report.records:
+            record = dict(record)
+            record.update({"error": cls.text(record.get("error"))})
+            records.append(record)
+        total = max(Report.total_topics, len(records))
+        cls.send({"event": "report", "records": records, "total": total})
+
+    @classmethod
+    def get_args(cls, request):
+        """Build shell arguments of a run from daemon arguments and request.
+
+        Args:
+            request (dict): Run request.
+
+        Raises:
+            ValueError: If request has no guide or no topics.
+
+        Returns:
+            Namespace: Shell arguments.
+        """
+
+        guide = request.get("guide")
+        if not isinstance(guide, basestring):
+            raise ValueError("Request has no guide")
+        topics, run_all = request.get("topics"), bool(request.get("all"))
+        if not topics and not run_all:
+            raise ValueError("Request has no topics to run")
+        placeholders = request.get("placeholders") or []
+        if not isinstance(placeholders, list):
+            raise ValueError("Request placeholders must be a list")
+        args = Namespace(**vars(cls.args))
+        args.guide = guide
+        args.run_topics = topics
+        args.run_all = run_all
+        args.topic = None
+        args.preview = False
+        args.placeholder = list(cls.args.placeholder or []) + placeholders
+        return args
+
+    @classmethod
+    def stream(cls, script):
+        """Create step callback sending results to client.
+
+        Args:
+            script (Script): Script running request.
+
+        Returns:
+            callable: Step callback.
+        """
+
+        def on_step(position, step, result):
+            success, output, error, cached, metrics = result
+            cls.send({
+                "event": "step",
+                "topic": script.topic.get_title(),
+                "position": position + 1,
+                "step": step.get_step(),
+                "success": bool(success),
+                "output": cls.text(output),
+                "error": error is not None,
+                "cached": cached,
+                "output_path": step.get_output_path(),
+                "metrics": metrics.to_dict(),
+            })
+
+        return on_step
+
+    @classmethod
+    def send(cls, event):
+        """Send event to client, if still connected.
+
+        A client going away doesn't stop the run; remaining events are
+        dropped.
+
+        Args:
+            event (dict): Event to send.
+        """
+
+        if cls.client is None:
+            return
+        try:
+            cls.client.sendall(json.dumps(event) + "\n")
+        except socket.error as e:
+            Log.warn("Client went away: %s" % e)
+            cls.client = None
+
+    @staticmethod
+    def text(value):
+        """Convert value to text safe to encode.
+
+        Args:
+            value (mixt): Output or error of a step.
+
+        Returns:
+            mixt: Unicode string or None.
+        """
+
+        if value is None or isinstance(value, unicode):
+            return value
+        if isinstance(value, str):
+            return value.decode("utf-8", "replace")
+        return unicode(value)
+
+    @classmethod
+    def request(cls, args):
+        """Send a run request to daemon and display its results.
+
+        Args:
+            args (Namespace): Shell arguments of client.
+
+        Raises:
+            SystemExit: If daemon is not reachable.
+        """
+
+        filepath = cls.get_socket_path(args.socket)
+        request = {
+            "guide": os.path.abspath(args.guide or "."),
+            "cwd": getcwd(),
+            "topics": args.run_topics or args.topic,
+            "all": args.run_all,
+            "placeholders": args.placeholder or [],
+        }
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(filepath)
+        except socket.error as e:
+            raise SystemExit("Cannot reach daemon on %s: %s" % (filepath, e))
+        reader = client.makefile("rb")
+        try:
+            client.sendall(json.dumps(request) + "\n")
+            for line in reader:
+                cls.display(json.loads(line))
+        finally:
+            reader.close()
+            client.close()
+        if args.report_json is not None:
+            Report.export(args.report_json)
+
+    @classmethod
+    def display(cls, event):
+        """Display an event received from daemon.
+
+        Steps are displayed the same way a local run does.
+
+        Args:
+            event (dict): Event received.
+        """
+
+        kind = event.get("event")
+        if kind == "step":
+            Log.info(u"Running \033[93m%s\033[0m ..." % event.get("step"))
+            output = event.get("output")
+            if event.get("error"):
+                Log.info(ERROR_LOG % output)
+            elif event.get("cached"):
+                Log.info(CACHED_LOG % output)
+            elif event.get("success"):
+                Log.info(SUCCESS_LOG % output)
+            else:
+                Log.info(FAILED_LOG % output)
+            if event.get("output_path") is not None:
+                Log.info("Full output => %s" % event.get("output_path"))
+        elif kind == "report":
+            Report.records = event.get("records") or []
+            Report.set_total_topics(event.get("total", 0))
+            Report.output()
+        elif kind == "error":
+            Log.error("Daemon refused request: %s" % event.get("message"))
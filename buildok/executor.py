@@ -0,0 +1,241 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from os import getcwd, path as fpath
+from threading import Thread
+from Queue import Queue, Empty
+
+from buildok.structures.instruction import Instruction
+from buildok.util.log import Log
+
+
+class Executor(object):
+    """Dependency-aware parallel runner of topic steps.
+
+    Steps are split in segments at barriers. A barrier is a step whose action
+    cannot tell what it touches (e.g. shell commands, changing directory) and
+    always runs alone, after everything before it. A step ending with `;` must
+    succeed before any later step starts. Inside a segment, steps run on a
+    pool of workers as soon as every earlier step they conflict with is done.
+    Two steps conflict if they touch overlapping paths or share a lock.
+
+    Results are always handed over in steps order, so output and report look
+    the same as a sequential run.
+
+    Args:
+        steps   (list): List of topic steps.
+        workers  (int): Number of parallel workers.
+        first    (int): Index of first step to run.
+        poll   (float): Seconds between checks for interrupts.
+    """
+
+    glob_chars = r"*?["
+
+    def __init__(self, steps, workers, first=0, poll=0.2):
+        self.steps = steps
+        self.workers = workers
+        self.first = first
+        self.poll = poll
+
+    def run(self, run_step, finish_step, ignore_fails=False):
+        """Run all steps.
+
+        Args:
+            run_step    (callable): Runs a step, returns its result. Called
+                                    from worker threads.
+            finish_step (callable): Logs and reports a result, returns False
+                                    if topic must stop. Called in order.
+            ignore_fails    (bool): Continue when steps fail.
+
+        Returns:
+            bool: True if a step failed or run was interrupted.
+        """
+
+        for first, last, barrier in self.segments():
+            if barrier:
+                try:
+                    result = run_step(first, self.steps[first])
+                except KeyboardInterrupt:
+                    Log.warn("Interrupted step (%d)" % (first + 1))
+                    return True
+                if not finish_step(first, self.steps[first], result,
+                                   ignore_fails):
+                    return True
+                continue
+            if not self.run_segment(first, last, run_step, finish_step,
+                                    ignore_fails):
+                return True
+        return False
+
+    def segments(self):
+        """Split steps in segments.
+
+        Returns:
+            iterator: First index, last index (exclusive) and barrier flag.
+        """
+
+        first = self.first
+        for position in range(self.first, len(self.steps)):
+            step = self.steps[position]
+            if self.get_resources(step) is None:
+                if first < position:
+                    yield first, position, False
+                yield position, position + 1, True
+                first = position + 1
+            elif step.get_punctuation() == Instruction.RunType.AND:
+                yield first, position + 1, False
+                first = position + 1
+        if first < len(self.steps):
+            yield first, len(self.steps), False
+
+    def run_segment(self, first, last, run_step, finish_step, ignore_fails):
+        """Run steps of a segment on a pool of workers.
+
+        Paths are resolved when the segment starts, since only barriers may
+        change the working directory.
+
+        Returns:
+            bool: True if topic can continue.
+        """
+
+        cwd = getcwd()
+        positions = range(first, last)
+        paths = dict((p, self.resolve(self.steps[p], cwd)) for p in positions)
+        waits = {}
+        for p in positions:
+            waits[p] = set(q for q in range(first, p)
+                           if self.conflict(self.steps[p], paths[p],
+                                            self.steps[q], paths[q]))
+            after = ", ".join(str(q + 1) for q in sorted(waits[p]))
+            Log.debug("Step (%d) waits for steps: %s" % (p + 1, after or "-"))
+
+        results, done, running = Queue(), {}, set()
+        pending = list(positions)
+        cursor, stopped = first, False
+
+        def worker(position):
+            results.put((position, run_step(position, self.steps[position])))
+
+        def submit():
+            for p in list(pending):
+                if len(running) >= self.workers:
+                    break
+                if not waits[p].issubset(done):
+                    continue
+                pending.remove(p)
+                running.add(p)
+                thread = Thread(target=worker, args=(p,))
+                thread.daemon = True
+                thread.start()
+
+        submit()
+        while len(running) > 0:
+            try:
+                position, result = results.get(timeout=self.poll)
+            except Empty:
+                continue
+            except KeyboardInterrupt:
+                Log.warn("Interrupted, waiting for running steps to finish")
+                del pending[:]
+                stopped = True
+                continue
+            running.discard(position)
+            done[position] = result
+            while not stopped and cursor in done:
+                step = self.steps[cursor]
+                if not finish_step(cursor, step, done[cursor], ignore_fails):
+                    stopped = True
+                    del pending[:]
+                cursor += 1
+            if not stopped:
+                submit()
+        for position in sorted(p for p in done if p >= cursor):
+            Log.debug("Discarded result of step (%d)" % (position + 1))
+        return not stopped
+
+    @classmethod
+    def get_resources(cls, step):
+        """Ask action which resources a step touches.
+
+        Args:
+            step (Instruction): Topic step.
+
+        Returns:
+            mixt: List of paths or None if unknown.
+        """
+
+        action = step.get_statement()
+        kwargs = step.get_kwarguments() or {}
+        args = step.get_arguments() or ()
+        if len(kwargs) >= len(args):
+            return action.resources(**kwargs)
+        return action.resources(*args)
+
+    @classmethod
+    def resolve(cls, step, cwd):
+        """Normalize resources of a step to absolute paths.
+
+        Globs are reduced to the deepest folder without wildcards.
+
+        Args:
+            step (Instruction): Topic step.
+            cwd          (str): Working directory to resolve against.
+
+        Returns:
+            list: List of absolute paths.
+        """
+
+        paths = []
+        for path in cls.get_resources(step):
+            if path is None:
+                continue
+            cut = [path.find(c) for c in cls.glob_chars if c in path]
+            if len(cut) > 0:
+                path = fpath.dirname(path[:min(cut)])
+            path = fpath.expanduser(path)
+            paths.append(fpath.normpath(fpath.join(cwd, path)))
+        return paths
+
+    def conflict(self, step, paths, other, other_paths):
+        """Check whetever two steps must not run at the same time.
+
+        Returns:
+            bool: True if steps share a lock or overlapping paths.
+        """
+
+        lock = step.get_statement().lock
+        if lock is not None and lock == other.get_statement().lock:
+            return True
+        for path in paths:
+            for other_path in other_paths:
+                if self.overlap(path, other_path):
+                    return True
+        return False
+
+    @staticmethod
+    def overlap(path, other_path):
+        """Check whetever one path contains the other.
+
+        Returns:
+            bool: True if paths are the same or nested.
+        """
+
+        path, other_path = path.rstrip("/") + "/", other_path.rstrip("/") + "/"
+        return path.startswith(other_path) or other_path.startswith(path)
@@ -0,0 +1,255 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import sqlite3
+
+from platform import node
+from time import time
+
+from buildok.util.state import state_path
+from buildok.util.sysenv import Sysenv
+from buildok.util.log import Log
+
+
+class History(object):
+    """Database of past runs, used to spot slow steps.
+
+    Each topic run is saved with its status, runtime, guide hash and host
+    facts, and every step with its metrics. A step that succeeds is compared
+    with its baseline, the median duration of its last successful runs in
+    the same topic, and a warning is logged if it took longer than factor
+    times the baseline.
+
+    Attributes:
+        enabled    (bool): Toggle saving runs.
+        state_file  (str): Database file name inside state directory.
+        factor    (float): Slowdown over baseline reported as regression.
+        window      (int): Number of past runs making a baseline.
+        samples     (int): Minimum number of past runs to have a baseline.
+        threshold (float): Steps faster than this (in seconds) are ignored.
+        conn (Connection): Open database connection.
+        filepath    (str): Path to database of open connection.
+    """
+
+    enabled = True
+    state_file = r"history.db"
+    factor = 2.0
+    window = 10
+    samples = 3
+    threshold = 0.1
+    conn = None
+    filepath = None
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS runs ("
+        " id INTEGER PRIMARY KEY, started REAL, guide TEXT, topic TEXT,"
+        " status TEXT, runtime REAL, host TEXT, os_name TEXT,"
+        " os_version TEXT, app_version TEXT)",
+        "CREATE TABLE IF NOT EXISTS steps ("
+        " run_id INTEGER, position INTEGER, step TEXT, status TEXT,"
+        " wall REAL, utime REAL, stime REAL, maxrss INTEGER, output INTEGER)",
+        "CREATE INDEX IF NOT EXISTS steps_by_step ON steps (step, run_id)",
+    )
+
+    @classmethod
+    def set_factor(cls, factor):
+        """Regression factor setter.
+
+        Args:
+            factor (float): Slowdown over baseline reported as regression.
+        """
+
+        cls.factor = factor
+
+    @classmethod
+    def connect(cls):
+        """Open database and create missing tables.
+
+        The connection is reopened if the state directory has changed since.
+
+        Returns:
+            Connection: Database connection.
+        """
+
+        filepath = state_path(cls.state_file)
+        if cls.conn is not None and cls.filepath != filepath:
+            cls.conn.close()
+            cls.conn = None
+        if cls.conn is None:
+            cls.filepath = filepath
+            cls.conn = sqlite3.connect(filepath)
+            cls.conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in cls.schema:
+                cls.conn.execute(statement)
+        return cls.conn
+
+    @classmethod
+    def record(cls, guide, report):
+        """Save a topic run and warn about steps slower than baseline.
+
+        Args:
+            guide   (str): Hash of guide.
+            report (dict): Report of topic, as returned by Report.snapshot.
+        """
+
+        try:
+            conn = cls.connect()
+            with conn:
+                for entry in report["steps"]:
+                    cls.check(conn, report["topic"], entry)
+                run = conn.execute(
+                    "INSERT INTO runs (started, guide, topic, status,"
+                    " runtime, host, os_name, os_version, app_version)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time() - report["runtime"], guide, report["topic"],
+                     report["status"], report["runtime"], node(),
+                     Sysenv.os_name, Sysenv.os_version, Sysenv.app_version))
+                conn.executemany(
+                    "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(run.lastrowid, e["position"], e["step"], e["status"],
+                      e["wall"], e["utime"], e["stime"], e["maxrss"],
+                      e["output"]) for e in report["steps"]])
+        except (sqlite3.Error, OSError) as e:
+            Log.warn("Cannot save run to history: %s" % e)
+
+    @classmethod
+    def check(cls, conn, topic, entry):
+        """Warn if a step took longer than its baseline allows.
+
+        Args:
+            conn (Connection): Database connection.
+            topic       (str): Title of topic.
+            entry      (dict): Step metrics.
+
+        Returns:
+            bool: True if step is a regression.
+        """
+
+        if entry["status"] != "OK" or entry["wall"] < cls.threshold:
+            return False
+        baseline = cls.get_baseline(conn, topic, entry["step"])
+        if baseline is None or entry["wall"] <= baseline * cls.factor:
+            return False
+        Log.warn(u"Step (%d) took %.3fs, %.1fx its baseline of %.3fs: %s" % (
+            entry["position"], entry["wall"], entry["wall"] / baseline,
+            baseline, entry["step"]))
+        return True
+
+    @classmethod
+    def get_baseline(cls, conn, topic, step):
+        """Median duration of last successful runs of a step.
+
+        Args:
+            conn (Connection): Database connection.
+            topic       (str): Title of topic.
+            step        (str): Text string of step.
+
+        Returns:
+            mixt: Duration in seconds or None if step has too few runs.
+        """
+
+        rows = conn.execute(
+            "SELECT s.wall FROM steps s JOIN runs r ON r.id = s.run_id"
+            " WHERE s.step = ? AND r.topic = ? AND s.status = 'OK'"
+            " ORDER BY s.run_id DESC LIMIT ?", (step, topic, cls.window))
+        durations = [wall for wall, in rows]
+        if len(durations) < cls.samples:
+            return None
+        return cls.median(durations)
+
+    @staticmethod
+    def median(values):
+        """Median of a list of numbers.
+
+        Args:
+            values (list): Non-empty list of numbers.
+
+        Returns:
+            float: Median value.
+        """
+
+        values = sorted(values)
+        middle = len(values) // 2
+        if len(values) % 2 == 1:
+            return values[middle]
+        return (values[middle - 1] + values[middle]) / 2.0
+
+    @classmethod
+    def output(cls, topic=None, limit=50):
+        """Dump duration trends of each step.
+
+        Compares the last duration of each step with the median of its last
+        successful runs.
+
+        Args:
+            topic (str): Show only this topic.
+            limit (int): Number of past runs per topic to look at.
+        """
+
+        try:
+            conn = cls.connect()
+        except (sqlite3.Error, OSError) as e:
+            return Log.warn("Cannot read history: %s" % e)
+        query = "SELECT id, topic, status FROM runs"
+        params = ()
+        if topic is not None:
+            query += " WHERE topic = ?"
+            params = (topic,)
+        runs = conn.execute(query + " ORDER BY id DESC", params).fetchall()
+        if len(runs) == 0:
+            return Log.info("No runs in history")
+        topics = []
+        for run_id, title, status in runs:
+            if title not in topics:
+                topics.append(title)
+        for title in topics:
+            ids = [r[0] for r in runs if r[1] == title][:limit]
+            last_status = [r[2] for r in runs if r[1] == title][0]
+            Log.info(u"""Topic "%s": %d runs, last %s""" % (
+                title, len(ids), last_status.upper()))
+            cls.output_steps(conn, ids)
+
+    @classmethod
+    def output_steps(cls, conn, ids):
+        """Dump duration trends of steps from some runs.
+
+        Args:
+            conn (Connection): Database connection.
+            ids        (list): Run ids, latest first.
+        """
+
+        marks = ", ".join("?" * len(ids))
+        rows = conn.execute(
+            "SELECT run_id, position, step, wall FROM steps"
+            " WHERE run_id IN (%s) AND status = 'OK'"
+            " ORDER BY run_id DESC, position" % marks, ids)
+        steps, durations = [], {}
+        for run_id, position, step, wall in rows:
+            if step not in durations:
+                steps.append((run_id, position, step))
+                durations[step] = []
+            durations[step].append(wall)
+        Log.info("    runs      last    median      best     worst  trend")
+        for _, _, step in sorted(steps, key=lambda s: (-s[0], s[1])):
+            walls = durations[step]
+            median = cls.median(walls)
+            trend = 0.0 if median == 0 else (walls[0] / median - 1) * 100
+            Log.info(u"%8d %8.3fs %8.3fs %8.3fs %8.3fs %+5.0f%%  %s" % (
+                len(walls), walls[0], median, min(walls), max(walls), trend,
+                step))
@@ -0,0 +1,219 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import json
+import os
+
+from hashlib import sha1
+from stat import S_ISDIR
+from threading import Lock
+
+from buildok.executor import Executor
+from buildok.placeholder import Placeholder
+from buildok.util.fs import scan_dir
+from buildok.util.state import state_path
+from buildok.util.log import Log
+
+
+class Incremental(object):
+    """Make-like skipping of steps whose inputs have not changed.
+
+    Each step that succeeds gets a fingerprint: step text, arguments,
+    payload, placeholders, working directory, plus size and modification
+    time of every path the step touches (and of folder entries down to a
+    few levels). Fingerprints are
+    taken after the whole topic ran, so changes made by later steps (e.g. a
+    file copied into a folder created earlier) don't invalidate a step on
+    the next run. A step whose fingerprint still matches is skipped as
+    cached.
+
+    Steps that cannot tell which paths they touch (e.g. shell commands) are
+    fingerprinted by text only, so they are skipped only while every earlier
+    step of the topic was skipped as well. Steps that are not cacheable
+    (e.g. changing directory) always run and don't break that chain.
+
+    Attributes:
+        enabled   (bool): Toggle incremental mode.
+        state_file (str): Database file name inside state directory.
+        depth      (int): Levels of folder entries added to fingerprints.
+        records   (dict): Recorded fingerprints by topic and step key.
+        done      (dict): Steps of running topic to fingerprint, by key.
+        topic      (str): Title of running topic.
+        fresh     (bool): True while every step so far was skipped.
+    """
+
+    enabled = False
+    state_file = r"state.json"
+    depth = 2
+
+    records = None
+    done = {}
+    topic = None
+    fresh = True
+
+    lock = Lock()
+
+    @classmethod
+    def start(cls, topic):
+        """Load state database and prepare to run a topic.
+
+        Args:
+            topic (str): Title of topic.
+        """
+
+        cls.topic = topic
+        cls.fresh = True
+        cls.done = {}
+        cls.records = {}
+        try:
+            filepath = state_path(cls.state_file)
+            if os.path.isfile(filepath):
+                with open(filepath, "r") as file_:
+                    cls.records = json.load(file_)
+        except Exception as e:
+            Log.debug("Ignoring broken state database: %s" % e)
+        cls.records.setdefault(topic, {})
+
+    @classmethod
+    def save(cls):
+        """Fingerprint steps that succeeded and write state database.
+        """
+
+        if cls.records is None:
+            return
+        records = cls.records[cls.topic]
+        for key, (step, cwd) in cls.done.iteritems():
+            records[key] = cls.fingerprint(step, cwd)
+        cls.done = {}
+        try:
+            filepath = state_path(cls.state_file)
+            tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+            with open(tmp_filepath, "w") as file_:
+                json.dump(cls.records, file_, indent=1, sort_keys=True)
+            os.rename(tmp_filepath, filepath)
+        except Exception as e:
+            Log.debug("Cannot save state database: %s" % e)
+
+    @classmethod
+    def get_key(cls, position, step):
+        """Identify a step inside its topic.
+
+        Returns:
+            str: Step key.
+        """
+
+        return "%d:%s" % (position, step.get_step())
+
+    @classmethod
+    def fingerprint(cls, step, cwd):
+        """Compute fingerprint of a step in current state.
+
+        Args:
+            step (Instruction): Topic step.
+            cwd          (str): Working directory of step.
+
+        Returns:
+            str: Hexadecimal fingerprint.
+        """
+
+        hasher = sha1()
+        for value in (step.get_step(), step.get_punctuation(),
+                      sorted((step.get_kwarguments() or {}).items()),
+                      step.get_arguments(), step.get_payload(),
+                      sorted((Placeholder.storage or {}).items()), cwd):
+            hasher.update(repr(value))
+        if Executor.get_resources(step) is not None:
+            for path in sorted(Executor.resolve(step, cwd)):
+                cls.hash_path(hasher, path)
+        return hasher.hexdigest()
+
+    @classmethod
+    def hash_path(cls, hasher, path):
+        """Add size and modification time of a path to fingerprint.
+
+        Entries of folders are added down to `depth` levels. Adding, removing
+        or renaming an entry changes the modification time of its folder, so
+        only edits of files deeper than that go unnoticed, while large trees
+        stay cheap to fingerprint.
+        """
+
+        try:
+            meta = os.lstat(path)
+        except OSError:
+            hasher.update("%s:missing" % path)
+            return
+        hasher.update("%s:%d:%r" % (path, meta.st_size, meta.st_mtime))
+        if not S_ISDIR(meta.st_mode):
+            return
+        pending = [(path, 1)]
+        while len(pending) > 0:
+            folder, level = pending.pop()
+            try:
+                entries = sorted(scan_dir(folder))
+            except OSError:
+                continue
+            for _, item, meta in entries:
+                hasher.update("%s:%d:%r" % (item, meta.st_size, meta.st_mtime))
+                if S_ISDIR(meta.st_mode) and level < cls.depth:
+                    pending.append((item, level + 1))
+
+    @classmethod
+    def is_cached(cls, position, step):
+        """Check whetever a step can be skipped.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Topic step.
+
+        Returns:
+            bool: True if step has not changed since it last succeeded.
+        """
+
+        if not step.get_statement().is_cacheable():
+            return False
+        if Executor.get_resources(step) is None and not cls.fresh:
+            return False
+        records = cls.records[cls.topic]
+        recorded = records.get(cls.get_key(position, step))
+        cached = recorded is not None and \
+            recorded == cls.fingerprint(step, os.getcwd())
+        if not cached:
+            cls.fresh = False
+        return cached
+
+    @classmethod
+    def record(cls, position, step, success):
+        """Record a step that ran or was skipped.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Topic step.
+            success    (bool): True if step succeeded.
+        """
+
+        if not step.get_statement().is_cacheable():
+            return
+        key = cls.get_key(position, step)
+        with cls.lock:
+            if success:
+                cls.done[key] = (step, os.getcwd())
+            else:
+                cls.done.pop(key, None)
+                cls.records[cls.topic].pop(key, None)
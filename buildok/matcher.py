@@ -41,10 +41,8 @@ class Matcher(object):
         step = text_step.strip()
         if len(step) == 0:
             return False
-        for exp, _ in Statement.get_statements():
-            if exp.match(step) is not None:
-                return True
-        return False
+        args, _ = Statement.lookup(step)
+        return args is not None
 
     @classmethod
     def pair_all(cls, instructions):
@@ -70,12 +68,11 @@ class Matcher(object):
             bool: True if instruction has a pair whitin statements.
         """
 
-        for exp, fun in Statement.get_statements():
-            args = exp.match(instruction.get_step())
-            if args is not None:
-                instruction.set_description(fun.parse_description())
-                instruction.set_statement(fun)
-                instruction.set_arguments(args.groups())
-                instruction.set_kwarguments(args.groupdict())
-                return True
-        return False
+        args, fun = Statement.lookup(instruction.get_step())
+        if args is None:
+            return False
+        instruction.set_description(fun.parse_description())
+        instruction.set_statement(fun.load())
+        instruction.set_arguments(args.groups())
+        instruction.set_kwarguments(args.groupdict())
+        return True
@@ -18,7 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from functools import partial
 from os import environ
+from re import compile, escape, UNICODE
 
 
 class Placeholder(object):
@@ -37,11 +39,19 @@ class Placeholder(object):
 
         --placeholder key1=newValue1 --placeholder key2=newPlaceholder
 
+    All stored keys are merged into a single expression, rebuilt whenever
+    the storage changes, so each string is substituted in one pass. Callers
+    may pass a set to collect placeholder-like tokens without a stored value
+    during the same pass.
+
     Raises:
         Exception: If specified placeholder file is invalid.
     """
 
     storage = None
+    pattern = None
+
+    token = r"[\w\-\.]+"
 
     @classmethod
     def config(cls, args):
@@ -65,6 +75,32 @@ class Placeholder(object):
             except Exception as e:
                 raise SystemExit(str(e))
         cls.storage.update(cls.parse_args(args))
+        cls.compile()
+
+    @classmethod
+    def reset(cls):
+        """Forget all stored placeholders.
+        """
+
+        cls.storage = None
+        cls.pattern = None
+
+    @classmethod
+    def compile(cls):
+        """Build placeholder expression from stored keys.
+
+        Longer keys come first, so a key is never shadowed by its prefix.
+        """
+
+        if not isinstance(cls.storage, dict):
+            cls.storage = {}
+        keys = sorted(cls.storage.iterkeys(), key=len, reverse=True)
+        if len(keys) > 0:
+            known = "|".join([escape(k) for k in keys])
+            exp = r"<(?:(?P<key>%s)|(?P<unknown>%s))>" % (known, cls.token)
+        else:
+            exp = r"<(?P<key>(?!))?(?P<unknown>%s)>" % cls.token
+        cls.pattern = compile(exp, UNICODE)
 
     @classmethod
     def parse_args(cls, args):
@@ -87,21 +123,42 @@ class Placeholder(object):
         return dict([tuple(kv.split("=", 1)) for kv in args if len(kv) > 1])
 
     @classmethod
-    def parse_string(cls, string):
+    def parse_string(cls, string, unresolved=None):
         """Key-value string parser.
 
         Replaces a string containing a placeholder with it's stored value.
 
         Args:
-            string (str): String to scan and update.
+            string      (str): String to scan and update.
+            unresolved  (set): Collects tokens without a stored value.
 
         Returns:
             str: Updated string.
         """
 
-        for k, v in cls.storage.iteritems():
-            string = string.replace("<%s>" % k, v)
-        return string
+        if cls.pattern is None:
+            cls.compile()
+        return cls.pattern.sub(partial(cls.replace, unresolved=unresolved),
+                               string)
+
+    @classmethod
+    def replace(cls, match, unresolved=None):
+        """Substitute a matched placeholder.
+
+        Args:
+            match (MatchObject): Placeholder match.
+            unresolved    (set): Collects tokens without a stored value.
+
+        Returns:
+            str: Stored value or unchanged placeholder if unresolved.
+        """
+
+        key = match.group("key")
+        if key is None:
+            if unresolved is not None:
+                unresolved.add(match.group("unknown"))
+            return match.group(0)
+        return cls.storage[key]
 
     @classmethod
     def scan_string(cls, string):
@@ -116,8 +173,10 @@ class Placeholder(object):
             bool: True if string has placeholders.
         """
 
-        for k in cls.storage.iterkeys():
-            if "<%s>" % k in string:
+        if cls.pattern is None:
+            cls.compile()
+        for match in cls.pattern.finditer(string):
+            if match.group("key") is not None:
                 return True
         return False
 
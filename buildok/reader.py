@@ -20,12 +20,95 @@
 
 from __future__ import print_function
 
+from array import array
+from mmap import mmap, ACCESS_READ
 from os import path
 
 from buildok.util.log import Log
 from buildok.util.console import Console
 
 
+class MappedLines(object):
+    """Read-only sequence of lines backed by a memory-mapped file.
+
+    Only line offsets are kept in memory; each line is sliced from the
+    mapped file when accessed. Slicing returns a view sharing the same
+    mapping, so reading ahead of a cursor never copies the rest of file.
+
+    Args:
+        data       (mmap): Memory-mapped file content.
+        offsets   (array): Start offset of every line.
+        start       (int): Index of first line in view.
+        stop        (int): Index after last line in view.
+    """
+
+    def __init__(self, data, offsets=None, start=0, stop=None):
+        self.data = data
+        self.offsets = offsets if offsets is not None else self.index(data)
+        self.start = start
+        self.stop = len(self.offsets) if stop is None else stop
+
+    @staticmethod
+    def index(data):
+        """Scan mapped content for line offsets.
+
+        Args:
+            data (mmap): Memory-mapped file content.
+
+        Returns:
+            array: Start offset of every line.
+        """
+
+        offsets, size, cursor = array("L"), len(data), 0
+        while cursor < size:
+            offsets.append(cursor)
+            newline = data.find(b"\n", cursor)
+            if newline == -1:
+                break
+            cursor = newline + 1
+        return offsets
+
+    def line(self, idx):
+        """Get a line without its trailing newline.
+
+        Args:
+            idx (int): Absolute line index.
+
+        Returns:
+            str: Line content.
+        """
+
+        start = self.offsets[idx]
+        if idx + 1 < len(self.offsets):
+            stop = self.offsets[idx + 1] - 1
+        else:
+            stop = len(self.data)
+            if self.data[stop-1:stop] == b"\n":
+                stop -= 1
+        return self.data[start:stop]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        for idx in xrange(self.start, self.stop):
+            yield self.line(idx)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return list(self)[key]
+            stop = max(start, stop)
+            return MappedLines(self.data, self.offsets,
+                               self.start + start, self.start + stop)
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError("line index out of range")
+        return self.line(self.start + key)
+
+
 class Reader(object):
     """Reader wrapper to gather build steps.
 
@@ -36,7 +119,7 @@ class Reader(object):
     Args:
         validate (bool): Enable or disable build steps validation.
         filename  (str): Build filename.
-        content  (list): Content from file context.
+        content  (list): Content from file context (see MappedLines).
         cursor    (int): Current line index being scanned.
         line      (str): Current line content.
     """
@@ -83,7 +166,12 @@ class Reader(object):
         """
 
         with open(self.filename, "rb") as file_:
-            self.content = [r.rstrip("\n") for r in file_.readlines()]
+            try:
+                data = mmap(file_.fileno(), 0, access=ACCESS_READ)
+            except ValueError:
+                self.content = []  # empty files cannot be mapped
+                return
+        self.content = MappedLines(data)
 
     def exists(self):
         """Check if build file exists.
@@ -187,7 +275,7 @@ class Reader(object):
         """Get content ahead of cursor.
 
         Returns:
-            list (list): Returns content ahead of cursor or empty list.
+            list (list): Returns view of content ahead of cursor or empty list.
         """
 
         index = self.cursor + 1
@@ -41,6 +41,7 @@ class ReadmeReader(Reader):
         delimiter         (str): Payload delimiter.
         recent_topic      (str): Holder for recent topic.
         no_topic_skip    (bool): Skip instruction if topic is missing.
+        unresolved        (set): Placeholders in steps without a value.
     """
 
     READER = r"README.md"
@@ -62,6 +63,7 @@ class ReadmeReader(Reader):
     last_step = None
 
     recent_topic = "n/a"
+    unresolved = None
     no_topic_skip = True
 
     delimiter = r"```"
@@ -70,11 +72,14 @@ class ReadmeReader(Reader):
     def parse(self, newlines=0):
         """Parse build steps file.
 
-        Loop through all steps and check for topics and instructions.
+        Loop through all steps and check for topics and instructions. Only
+        steps are checked for unresolved placeholders, since payloads often
+        hold text such as `#include <stdio.h>`.
         """
 
         Log.debug("Guide has %d lines" % len(self.content))
         self.last_guide = Guide()
+        self.unresolved = set()
         while self.has_next():
             line = self.get_line(strip=True)
             if len(line) == 0:
@@ -86,6 +91,7 @@ class ReadmeReader(Reader):
             self.check_topic(line)
             self.check_instruction(line).check_payload(self.next_content())
             self.next_line()
+        self.last_guide.set_unresolved(sorted(self.unresolved))
 
     def get_guide(self):
         """Get latest guide.
@@ -96,6 +102,17 @@ class ReadmeReader(Reader):
 
         return self.last_guide
 
+    def set_guide(self, guide):
+        """Set latest guide.
+
+        Used to restore an already parsed guide (e.g. from cache).
+
+        Args:
+            guide (Guide): Guide instance.
+        """
+
+        self.last_guide = guide
+
     def get_guide_by_topic(self):
         """Get new guide filtered by topic.
 
@@ -145,9 +162,8 @@ class ReadmeReader(Reader):
             return self
         scan = Instruction.PATTERN.match(line)
         if scan is not None:
-            step = scan.group("step")
-            if Placeholder.scan_string(step):
-                step = Placeholder.parse_string(step)
+            step = Placeholder.parse_string(scan.group("step"),
+                                            self.unresolved)
             punct = scan.group("punct")
             self.last_step = Instruction(self.get_line_number(), step, punct)
             if self.last_topic is None:
@@ -184,9 +200,7 @@ class ReadmeReader(Reader):
             raise self.UnclosedPayloadError(self.last_step)
         try:
             a, z = borders
-            payload = content[1+a:z]
-            if Placeholder.scan_list(payload):
-                payload = Placeholder.parse_list(payload)
+            payload = Placeholder.parse_list(content[1+a:z])
             self.last_step.set_payload(payload)
             self.skip_line(lines=z+1)
             self.last_step = None
@@ -208,9 +222,7 @@ class ReadmeReader(Reader):
             return Console.green(preview_line, "<--- %s" % line_desc)
         line_step = Instruction.PATTERN.match(line)
         if line_step is not None:
-            step = line_step.group("step")
-            if Placeholder.scan_string(step):
-                step = Placeholder.parse_string(step)
+            step = Placeholder.parse_string(line_step.group("step"))
             topic = self.last_guide.get_topic_by_title(self.recent_topic)
             if topic.has_step(step):
                 if Matcher.is_valid(step):
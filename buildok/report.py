@@ -20,6 +20,8 @@
 
 from __future__ import print_function
 
+import json
+
 from buildok.util.log import Log
 
 
@@ -32,7 +34,13 @@ class Report(object):
         topic        (str): Topic as text string.
         total_steps  (int): Total steps found in choosen topic.
         current_step (int): Last step counted while looping instructions.
+        cached_steps (int): Steps skipped because nothing changed.
         error        (str): Human-readable text error (e.g. Permission denied).
+        records     (list): Archived reports of topics run before, when
+                            running more than one topic.
+        total_topics (int): Number of topics queued to run.
+        steps       (list): Metrics of each step of current topic.
+        top          (int): Number of slowest steps to display.
     """
 
     runtime = 0
@@ -40,7 +48,12 @@ class Report(object):
     topic = "n/a"
     total_steps = 0
     current_step = 0
+    cached_steps = 0
     error = "n/a"
+    records = []
+    total_topics = 0
+    steps = []
+    top = 5
 
     @classmethod
     def set_runtime(cls, runtime):
@@ -84,14 +97,185 @@ class Report(object):
 
         cls.current_step += inc
 
+    @classmethod
+    def inc_cached(cls, inc):
+        """Increment cached steps value.
+        """
+
+        cls.cached_steps += inc
+
+    @classmethod
+    def add_step(cls, position, step, status, metrics):
+        """Save metrics of a step.
+
+        Args:
+            position (int): Step index in topic.
+            step     (str): Text string of step.
+            status   (str): Short status of step (e.g. OK, Failed).
+            metrics (dict): Step metrics.
+        """
+
+        entry = {"position": position + 1, "step": step, "status": status}
+        entry.update(metrics)
+        cls.steps.append(entry)
+
+    @classmethod
+    def set_total_topics(cls, total_topics):
+        """Set total topics value.
+        """
+
+        cls.total_topics = total_topics
+
+    @classmethod
+    def archive(cls):
+        """Save report of current topic and reset it for the next topic.
+        """
+
+        cls.records.append(cls.snapshot())
+        cls.clear()
+
+    @classmethod
+    def snapshot(cls):
+        """Report of current topic.
+
+        Returns:
+            dict: Report properties as key-value.
+        """
+
+        return {
+            "topic": cls.topic,
+            "status": cls.status,
+            "total_steps": cls.total_steps,
+            "current_step": cls.current_step,
+            "cached_steps": cls.cached_steps,
+            "error": cls.error,
+            "runtime": cls.runtime,
+            "steps": cls.steps,
+        }
+
+    @classmethod
+    def clear(cls):
+        """Reset report of current topic.
+        """
+
+        cls.runtime = 0
+        cls.status = "n/a"
+        cls.topic = "n/a"
+        cls.total_steps = 0
+        cls.current_step = 0
+        cls.cached_steps = 0
+        cls.error = "n/a"
+        cls.steps = []
+
+    @classmethod
+    def reset(cls):
+        """Reset report of current topic and drop archived reports.
+        """
+
+        cls.clear()
+        cls.records = []
+        cls.total_topics = 0
+
     @classmethod
     def output(cls):
         """Dump report of each saved property.
         """
 
+        if len(cls.records) > 0:
+            return cls.output_records()
+
         ran_status = (cls.current_step, cls.total_steps)
         Log.info("""Topic name: "%s" """ % cls.topic)
         Log.info("Steps ran successful %d out of %d" % ran_status)
+        if cls.cached_steps > 0:
+            Log.info("Steps skipped as cached %d" % cls.cached_steps)
         Log.info("""Last step error: "%s" """ % cls.error)
+        cls.output_slowest(cls.steps)
         Log.info("Runtime %ss" % cls.runtime)
         Log.info("Build %s" % cls.status.upper())
+
+    @classmethod
+    def output_records(cls):
+        """Dump combined report of all topics that ran.
+        """
+
+        runtime, steps = 0, []
+        for record in cls.records:
+            ran_status = (record["current_step"], record["total_steps"])
+            Log.info("""Topic name: "%s" """ % record["topic"])
+            Log.info("Steps ran successful %d out of %d" % ran_status)
+            if record["cached_steps"] > 0:
+                Log.info("Steps skipped as cached %d" % record["cached_steps"])
+            if record["status"] not in ("OK", "FAKED"):
+                Log.info("""Last step error: "%s" """ % record["error"])
+            Log.info("Runtime %ss" % record["runtime"])
+            Log.info("Topic %s" % record["status"].upper())
+            runtime += record["runtime"]
+            steps.extend(record.get("steps") or [])
+        succeeded = len([r for r in cls.records if r["status"] == "OK"])
+        total = max(cls.total_topics, len(cls.records))
+        Log.info("Topics ran successful %d out of %d" % (succeeded, total))
+        cls.output_slowest(steps)
+        Log.info("Runtime %ss" % runtime)
+        Log.info("Build %s" % cls.get_build_status(cls.records).upper())
+
+    @classmethod
+    def get_build_status(cls, records):
+        """Overall status of topics that ran.
+
+        Args:
+            records (list): Reports of topics.
+
+        Returns:
+            str: Status of first topic that did not succeed, Failed if some
+                 queued topics did not run, otherwise OK.
+        """
+
+        for record in records:
+            if record["status"] not in ("OK", "FAKED"):
+                return record["status"]
+        if len(records) < cls.total_topics:
+            return "Failed"
+        return "OK"
+
+    @classmethod
+    def output_slowest(cls, steps):
+        """Dump table of slowest steps.
+
+        Args:
+            steps (list): Metrics of steps.
+        """
+
+        def by_wall(entry):
+            return entry["wall"]
+
+        slowest = sorted(steps, key=by_wall, reverse=True)[:cls.top]
+        if len(slowest) == 0:
+            return
+        Log.info("Slowest steps (wall, user, sys, peak rss, output):")
+        for entry in slowest:
+            rss = "-" if entry["maxrss"] is None else "%dK" % entry["maxrss"]
+            Log.info(u"%8.3fs %8.3fs %8.3fs %9s %9dB  %s" % (
+                entry["wall"], entry["utime"], entry["stime"], rss,
+                entry["output"], entry["step"]))
+
+    @classmethod
+    def export(cls, filepath):
+        """Save report as JSON file.
+
+        Args:
+            filepath (str): Path to report file.
+        """
+
+        records = cls.records if len(cls.records) > 0 else [cls.snapshot()]
+        data = {
+            "status": cls.get_build_status(records),
+            "total_topics": max(cls.total_topics, len(records)),
+            "topics": records,
+        }
+        try:
+            with open(filepath, "w") as file_:
+                json.dump(data, file_, indent=1, default=str)
+            Log.info("Report saved to %s" % filepath)
+        except Exception as e:
+            Log.warn("Cannot save report: %s" % e)
@@ -21,17 +21,30 @@
 from __future__ import print_function
 
 from timeit import default_timer
-from os import getpid
+from os import chdir, getcwd, getpid, path
 
+from buildok.cache import Cache
+from buildok.checkpoint import Checkpoint
 from buildok.converter import Converter
+from buildok.executor import Executor
+from buildok.history import History
+from buildok.incremental import Incremental
 from buildok.matcher import Matcher
+from buildok.placeholder import Placeholder
 from buildok.reader import Reader
 from buildok.report import Report
+from buildok.statement import Statement
 
 from buildok.readers.read_me import ReadmeReader
+from buildok.structures.instruction import Instruction
 from buildok.structures.topic import Topic
 from buildok.statements.invoke import InvokeTopic
+from buildok.util.capture import Capture
 from buildok.util.log import Log
+from buildok.util.metrics import Metrics
+from buildok.util.process import Process
+from buildok.util.session import ShellSession
+from buildok.util.trace import Trace
 
 
 PID = getpid()
@@ -43,6 +56,11 @@ RUN_INSTRUCTIONS = """
     field blank will end session.
 """
 
+SUCCESS_LOG = u"\033[92m\u2713 (Success)\033[0m \033[93m%s\033[0m"
+FAILED_LOG = u"\033[91m? (Failed)\033[0m \033[95m%s\033[0m"
+ERROR_LOG = u"\033[91m? (Error) %s\033[0m"
+CACHED_LOG = u"\033[96m\u2713 (Cached)\033[0m \033[93m%s\033[0m"
+
 WARNING_UNSAFE_SHELL = u"""\033[91m
     Detected --unsafe-shell option! Use this option on your own risk only if
     you really know what you're doing! Please check documentation if you're not
@@ -61,6 +79,17 @@ class Script(object):
         last_step     (int): Last step index.
         guide_topics (list): List of guide topics.
         convert      (bool): Convertion flag.
+        fake_run     (bool): Parse guide without running steps.
+        workers       (int): Number of parallel workers.
+        batch        (bool): Merge consecutive steps of the same statement.
+        resume       (bool): Continue topic from last checkpoint.
+        first_step    (int): Index of first step to run.
+        guide_hash    (str): Hash of guide and parsing options.
+        queue        (list): Topics to run without prompting.
+        checkpoint   (dict): Checkpoint to resume from.
+        start_dir     (str): Working directory at launch.
+        on_step  (callable): Called with position, step and result after
+                             each step (e.g. to stream results).
     """
 
     def __init__(self, args):
@@ -71,6 +100,15 @@ class Script(object):
         self.guide_topics = None
         self.convert = False
         self.fake_run = False
+        self.workers = 1
+        self.batch = False
+        self.resume = False
+        self.first_step = 0
+        self.guide_hash = None
+        self.queue = []
+        self.checkpoint = None
+        self.start_dir = getcwd()
+        self.on_step = None
         Log.info("Initializing...")
 
     def setup(self):
@@ -101,7 +139,78 @@ class Script(object):
         # Toggle fake run
         self.fake_run = self.args.fake_run
 
+        # Run independent steps in parallel
+        if self.args.parallel is not None and self.args.parallel > 1:
+            self.workers = self.args.parallel
+            Log.info("Parallel workers set to: %d" % self.workers)
+
+        # Merge consecutive install steps
+        if self.args.batch_install:
+            self.batch = True
+            Log.info("Consecutive install steps are merged")
+
+        # Continue a failed topic from last checkpoint
+        if self.args.resume:
+            self.resume = True
+            Log.info("Resuming from last checkpoint if any")
+
+        # Skip steps whose inputs have not changed
+        if self.args.incremental:
+            Incremental.enabled = True
+            Log.info("Incremental mode: unchanged steps are skipped")
+
+        # Keep only the tail of command output in memory
+        if self.args.output_tail is not None:
+            Capture.set_tail(max(1, self.args.output_tail))
+            Log.info("Output tail set to: %d lines" % Capture.tail)
+
+        # Keep one shell session for all shell commands of topic
+        if self.args.persistent_shell:
+            ShellSession.enabled = True
+            Log.info("Shell commands run in a persistent session")
+
+        # Limit runtime of spawned commands
+        if self.args.timeout is not None:
+            Process.set_timeout(self.args.timeout)
+            Log.info("Command timeout set to: %ss" % self.args.timeout)
+
+        # Toggle history of runs
+        if self.args.no_history:
+            History.enabled = False
+            Log.info("History of runs disabled")
+
+        # Set slowdown reported as regression
+        if self.args.regression_factor is not None:
+            History.set_factor(self.args.regression_factor)
+            Log.info("Regression factor set to: %s" % History.factor)
+
+        # Toggle parsed guide cache
+        if self.args.no_cache:
+            Cache.enabled = False
+            Log.info("Guide cache disabled")
+
     def run(self, ignore_fails=False):
+        """Run all steps for the current selected topic, then any queued
+        topics one after another.
+
+        Topics run sequentially, each from the launch working directory,
+        since changing directory affects the whole process. Remaining
+        topics are skipped after a failed one.
+        """
+
+        self.run_topic(ignore_fails)
+        for topic in self.queue[1:]:
+            Report.archive()
+            if Report.records[-1].get("status") not in ("OK", "FAKED"):
+                Log.warn("Skipping remaining topics after failed topic")
+                break
+            chdir(self.start_dir)
+            self.select_topic(topic)
+            self.run_topic(ignore_fails)
+        if len(self.queue) > 1 and Report.topic != "n/a":
+            Report.archive()
+
+    def run_topic(self, ignore_fails=False):
         """Run all steps for the current selected topic.
         """
 
@@ -122,45 +231,37 @@ class Script(object):
         Converter.check() and Converter.save(self.steps)
         Log.debug("Conversion done!")
 
-    def launch_topic(self, ignore_fails=False, failed=False):
+    def launch_topic(self, ignore_fails=False):
         """Launch topic and run all steps.
+
+        Steps run one after another, or on a pool of workers if parallel
+        mode is enabled.
         """
 
-        total_steps = len(self.topic.get_steps())
+        total_steps = len(self.steps)
         Log.info("Preparing to run %d steps from topic..." % total_steps)
 
         # Loop steps and run each one
         start_time = default_timer()
         Log.debug("Setting start time: %s" % start_time)
 
-        success_log = u"\033[92m\u2713 (Success)\033[0m \033[93m%s\033[0m"
-        failed_log = u"\033[91m? (Failed)\033[0m \033[95m%s\033[0m"
-        error_log = u"\033[91m? (Error) %s\033[0m"
+        traced = Trace.start()
+        if Incremental.enabled:
+            Incremental.start(self.topic.get_title())
 
-        for self.last_step, step in enumerate(self.steps):
-            step_count, step_desc = self.last_step + 1, step.get_description()
-            Log.debug("Preparing step (%d) %s" % (step_count, step_desc))
-            Log.info(u"Running \033[93m%s\033[0m ..." % step.get_step())
-            try:
-                success, output = step.run()
-                if success:
-                    Log.info(success_log % output)
-                else:
-                    Log.info(failed_log % output)
-                    if not ignore_fails:
-                        failed = True
-                        Report.set_error(output)
-                        break
-                Report.inc_step(1)
-            except KeyboardInterrupt:
-                Log.info("Stopping current step...")
-                Log.warn("Interrupting may lead to unexpected results")
-                Log.warn("Stop master process at your own risk (PID %s)" % PID)
-            except Exception as e:
-                failed = True
-                Report.set_error(e)
-                Log.info(error_log % str(e))
-                break
+        self.save_checkpoint(self.first_step)
+        Report.inc_step(self.first_step)
+
+        if self.workers > 1:
+            Log.info("Running steps on %d parallel workers" % self.workers)
+            executor = Executor(self.steps, self.workers, self.first_step)
+            failed = executor.run(self.run_step, self.finish_step,
+                                  ignore_fails)
+        else:
+            failed = self.launch_steps(ignore_fails)
+        ShellSession.close()
+        if Incremental.enabled:
+            Incremental.save()
 
         stop_time = default_timer()
         Log.debug("Set stop time: %s" % stop_time)
@@ -172,14 +273,222 @@ class Script(object):
         # Wrap up...
         Log.debug("Done running steps...")
         title = self.topic.get_title()
+        Trace.finish(traced, title, "topic", steps=total_steps,
+                     failed=failed)
         if failed:
             Log.info("An error occured while topic '%s' was running" % title)
             Report.set_status("Failed")
         else:
             Log.info("Topic '%s' has ran all steps with no errors" % title)
             Report.set_status("OK")
+            Checkpoint.clear()
+        Checkpoint.close()
+        if History.enabled:
+            History.record(self.guide_hash, Report.snapshot())
         Log.debug("Closing...")
 
+    def launch_steps(self, ignore_fails=False):
+        """Run all steps one after another.
+
+        Returns:
+            bool: True if a step failed.
+        """
+
+        for self.last_step in range(self.first_step, len(self.steps)):
+            step = self.steps[self.last_step]
+            self.announce_step(self.last_step, step)
+            try:
+                result = self.run_step(self.last_step, step)
+            except KeyboardInterrupt:
+                Log.info("Stopping current step...")
+                Log.warn("Interrupting may lead to unexpected results")
+                Log.warn("Stop master process at your own risk (PID %s)" % PID)
+                continue
+            position = self.last_step
+            if not self.finish_step(position, step, result, ignore_fails,
+                                    announced=True):
+                return True
+        return False
+
+    def announce_step(self, position, step):
+        """Log the header of a step.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Step about to run or that ran.
+        """
+
+        step_desc = step.get_description()
+        Log.debug("Preparing step (%d) %s" % (position + 1, step_desc))
+        Log.info(u"Running \033[93m%s\033[0m ..." % step.get_step())
+
+    def run_step(self, position, step):
+        """Run a single step.
+
+        Safe to call from worker threads; nothing is logged or reported here.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Step to run.
+
+        Returns:
+            tuple: Success flag, output message, exception (if raised),
+                   cached flag and metrics.
+        """
+
+        started = Trace.start()
+        result = self.execute_step(position, step)
+        Trace.finish(started, step.get_step(), "step", position=position + 1,
+                     status=self.get_result_status(result))
+        return result
+
+    def execute_step(self, position, step):
+        """Run a single step, or skip it if cached, and measure it.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Step to run.
+
+        Returns:
+            tuple: Result as returned by run_step.
+        """
+
+        incremental = Incremental.enabled
+        metrics = Metrics()
+        try:
+            if incremental and Incremental.is_cached(position, step):
+                Incremental.record(position, step, True)
+                return True, "Nothing changed", None, True, metrics.stop()
+            success, output = step.run()
+            if incremental:
+                Incremental.record(position, step, success)
+            return success, output, None, False, metrics.stop()
+        except Exception as e:
+            if incremental:
+                Incremental.record(position, step, False)
+            return False, str(e), e, False, metrics.stop()
+
+    def finish_step(self, position, step, result, ignore_fails=False,
+                    announced=False):
+        """Log and report the result of a step.
+
+        Always called in steps order, so output and report stay the same no
+        matter how steps ran. Steps run one after another have their header
+        logged before they run; steps run on parallel workers have it logged
+        here, next to their result.
+
+        Args:
+            position    (int): Step index in topic.
+            step (Instruction): Step that ran.
+            result    (tuple): Result returned by run_step.
+            announced  (bool): Header was already logged.
+
+        Returns:
+            bool: True if topic can continue.
+        """
+
+        success, output, error, cached, metrics = result
+        self.last_step = position
+        metrics.set_output(self.get_output_size(step, output))
+        Report.add_step(position, step.get_step(), self.get_result_status(
+            result), metrics.to_dict())
+        if self.on_step is not None:
+            self.on_step(position, step, result)
+        if not announced:
+            self.announce_step(position, step)
+        if error is not None:
+            Report.set_error(error)
+            Log.info(ERROR_LOG % output)
+            return False
+        if cached:
+            Log.info(CACHED_LOG % output)
+            Report.inc_cached(1)
+        elif success:
+            Log.info(SUCCESS_LOG % output)
+        else:
+            Log.info(FAILED_LOG % output)
+        if step.get_output_path() is not None:
+            Log.info("Full output => %s" % step.get_output_path())
+        if not success and not ignore_fails:
+            Report.set_error(output)
+            return False
+        Report.inc_step(1)
+        self.save_checkpoint(position + 1)
+        return True
+
+    def get_result_status(self, result):
+        """Short status of a step result.
+
+        Args:
+            result (tuple): Result returned by run_step.
+
+        Returns:
+            str: Error, Cached, OK or Failed.
+        """
+
+        success, _, error, cached, _ = result
+        if error is not None:
+            return "Error"
+        if cached:
+            return "Cached"
+        return "OK" if success else "Failed"
+
+    def get_output_size(self, step, output):
+        """Size of step output, including output saved to file.
+
+        Args:
+            step (Instruction): Step that ran.
+            output      (mixt): Output message of step.
+
+        Returns:
+            int: Size in bytes.
+        """
+
+        filepath = step.get_output_path()
+        if filepath is not None and path.isfile(filepath):
+            return path.getsize(filepath)
+        if isinstance(output, unicode):
+            return len(output.encode("utf-8"))
+        if isinstance(output, str):
+            return len(output)
+        return 0
+
+    def save_checkpoint(self, position):
+        """Save progress of running topic.
+
+        Args:
+            position (int): Index of next step to run.
+        """
+
+        title = self.topic.get_title()
+        Checkpoint.save(title, position, len(self.steps), self.guide_hash)
+
+    def resume_topic(self, checkpoint):
+        """Continue topic from checkpoint.
+
+        Skips steps that already succeeded and changes directory to where
+        the last run left off.
+
+        Args:
+            checkpoint (dict): Checkpoint data.
+        """
+
+        title = self.topic.get_title()
+        if checkpoint.get("topic") != title:
+            Log.warn("Checkpoint is for topic '%s', starting over" %
+                     checkpoint.get("topic"))
+            return
+        if checkpoint.get("total") != len(self.steps):
+            Log.warn("Topic steps changed since checkpoint, starting over")
+            return
+        self.first_step = checkpoint.get("step", 0)
+        cwd = checkpoint.get("cwd")
+        if cwd is not None:
+            chdir(cwd)
+            Log.info("Changed directory to checkpoint: %s" % cwd)
+        Log.info("Resuming topic '%s' from step %d" % (
+            title, self.first_step + 1))
+
     def parse(self):
         """Parse guide and extract topics.
 
@@ -188,9 +497,7 @@ class Script(object):
         """
 
         rr = ReadmeReader(validate=True)
-        rr.read()
-        rr.parse()
-        Log.info("Parsing guide...")
+        self.load_guide(rr)
 
         # Preview scanned guide
         if self.args.preview:
@@ -208,18 +515,16 @@ class Script(object):
         # Prepare guide topics
         self.guide_topics = guide.get_topics()
 
-        # Pair each step with appropriate statement
+        # Check each step is paired with appropriate statement
         if self.args.strict:
             if not all([self.pair_steps(t) for t in self.guide_topics]):
                 Report.set_status("Halted")
                 Report.set_error("Unsupported steps")
                 Log.fatal("Cannot continue because of unsupported steps")
         else:
-            for t in self.guide_topics:
-                for step in t.get_steps():
-                    pair = Matcher.pair_one(step)
-                    if not pair:
-                        self.guide_topics.remove(t)
+            paired = [t for t in self.guide_topics if self.pair_steps(t)]
+            guide.set_topics(paired)
+            self.guide_topics = guide.get_topics()
 
         # Scan topics
         topics = [t.get_title() for t in guide.get_topics()]
@@ -231,6 +536,23 @@ class Script(object):
         else:
             Log.info("Guide has %d topics" % topics_len)
 
+        # Look for last checkpoint
+        if self.resume:
+            self.checkpoint = Checkpoint.load(self.guide_hash)
+            if self.checkpoint is None:
+                Log.info("No checkpoint found, starting topic over")
+
+        # Queue topics given on command line
+        self.queue = self.get_queued_topics()
+        if len(self.queue) > 0:
+            titles = ", ".join(t.get_title() for t in self.queue)
+            Log.info("Running %d topics: %s" % (len(self.queue), titles))
+            Report.set_total_topics(len(self.queue))
+            if self.args.unsafe_shell:
+                print(WARNING_UNSAFE_SHELL)
+            self.select_topic(self.queue[0])
+            return self
+
         # Handle topics
         Log.info("Found the following topics...")
         print("")
@@ -242,56 +564,283 @@ class Script(object):
         if self.args.unsafe_shell:
             print(WARNING_UNSAFE_SHELL)
 
-        # Save topic and topic's steps
-        self.topic = self.get_user_input()
-        self.steps = self.topic.get_steps()
+        # Choose topic to run
+        topic = None
+        if self.checkpoint is not None and self.args.topic is None:
+            topic = self.find_guide_topic(self.checkpoint.get("topic"))
+        if topic is None:
+            topic = self.get_user_input()
+        self.select_topic(topic)
+        return self
+
+    def select_topic(self, topic):
+        """Prepare topic to run.
+
+        Saves topic and topic's steps with invoked topics expanded, and
+        resumes topic from checkpoint if it's the one that failed.
+
+        Args:
+            topic (Topic): Topic to run.
+        """
+
+        self.topic = topic
+        self.first_step = 0
+        self.steps = self.topic.get_plan()
+        if self.steps is None:
+            title = self.topic.get_title()
+            Log.fatal("Topic '%s' has circular invokes" % title)
+        if self.batch:
+            self.steps = self.batch_steps(self.steps)
+        if self.checkpoint is not None:
+            if len(self.queue) == 0 or \
+                    self.checkpoint.get("topic") == topic.get_title():
+                self.resume_topic(self.checkpoint)
 
         # Confirm topic
         print("")
         Log.info(u"Matching topic \033[92m%s\033[0m" % self.topic.get_title())
 
-        # Patch topic imports
-        self.patch_topic_invoke(self.steps)
-
         # Prepare report
         Report.set_total_steps(len(self.steps))
         Report.set_topic(self.topic.get_title())
-        return self
 
-    def pair_steps(topic):
-        """Pair topic steps.
+    def get_queued_topics(self):
+        """Topics to run without prompting, as given on command line.
+
+        Returns:
+            list: List of topics; empty if user must choose a topic.
         """
 
-        return Matcher.pair_all(topic.get_steps())
+        if self.args.run_all:
+            return list(self.guide_topics)
+        if self.args.run_topics is None:
+            return []
+        queue = []
+        for title in self.args.run_topics.split(","):
+            topic = self.find_guide_topic(title.strip(), True)
+            if topic is None:
+                Log.fatal("Guide has no such topic: %s" % title.strip())
+            queue.append(topic)
+        return queue
+
+    def load_guide(self, reader):
+        """Read, parse and pair guide or load it from cache.
+
+        Cached guides are already paired with statements and have all
+        placeholders applied.
+
+        Args:
+            reader (Reader): Reader instance of guide.
+        """
+
+        filepath, _ = reader.get_build_source()
+        placeholders = sorted((Placeholder.storage or {}).items())
+        cache_args = (placeholders, Topic.TOPIC_PATTERN, Statement.signature)
+        cache_key = Cache.digest(filepath, *cache_args)
+        self.guide_hash = cache_key
+        started = Trace.start()
+        guide = Cache.load(cache_key)
+        Trace.finish(started, "Cache.load", "guide", hit=guide is not None)
+        if guide is not None:
+            Log.info("Loading guide from cache...")
+            reader.set_guide(guide)
+            return self.warn_unresolved(guide)
+
+        started = Trace.start()
+        reader.read()
+        Trace.finish(started, "Reader.read", "guide", path=filepath)
+        started = Trace.start()
+        reader.parse()
+        Trace.finish(started, "ReadmeReader.parse", "guide")
+        Log.info("Parsing guide...")
+        guide = reader.get_guide()
+        started = Trace.start()
+        for topic in guide.get_topics() or []:
+            Matcher.pair_all(topic.get_steps() or [])
+        Trace.finish(started, "Matcher.pair_all", "guide")
+        started = Trace.start()
+        self.resolve_plans(guide)
+        Trace.finish(started, "Script.resolve_plans", "guide")
+        started = Trace.start()
+        Cache.save(cache_key, guide)
+        Trace.finish(started, "Cache.save", "guide")
+        self.warn_unresolved(guide)
+
+    def warn_unresolved(self, guide):
+        """Warn about placeholders in steps without a value.
+
+        Args:
+            guide (Guide): Parsed or cached guide.
+        """
+
+        unresolved = guide.get_unresolved()
+        if len(unresolved) > 0:
+            Log.warn("Unresolved placeholders: %s" % ", ".join(unresolved))
+
+    def resolve_plans(self, guide):
+        """Expand invoked topics of every topic into execution plans.
 
-    def patch_topic_invoke(self, steps):
-        """Scan steps for topic invoking.
+        Each topic is expanded once and reused by all topics invoking it.
+        Topics with circular invokes are left without a plan.
 
-        Replace invoker step with topic's steps.
+        Args:
+            guide (Guide): Parsed and paired guide.
         """
 
-        for i, step in enumerate(steps):
+        plans = {}
+        for topic in guide.get_topics() or []:
+            try:
+                topic.set_plan(self.resolve_plan(guide, topic, plans))
+            except ValueError as e:
+                Log.warn(str(e))
+                topic.set_plan(None)
 
-            # Skip if step is not an invoker
-            if step.action is not InvokeTopic:
-                continue
+    def resolve_plan(self, guide, topic, plans):
+        """Expand invoked topics of a topic into a flat list of steps.
+
+        Expansion uses an explicit stack, so deeply nested invokes are not
+        limited by recursion depth.
 
-            # Find invoked topic
-            topic = step.get_kwarguments().get("topic", "")
-            topic_steps = self.get_steps_by_topic(topic)
-            self.patch_topic_invoke(topic_steps)
-            self.steps[i:i+1] = topic_steps
+        Args:
+            guide (Guide): Guide to lookup invoked topics.
+            topic (Topic): Topic to expand.
+            plans  (dict): Memo of already expanded topics.
+
+        Raises:
+            ValueError: If topics invoke each other in a circle.
+
+        Returns:
+            list: List of instructions.
+        """
 
-    def get_steps_by_topic(self, topic_name):
-        """Retrieve steps by topic name.
+        title = topic.get_title().lower()
+        if title in plans:
+            return plans[title]
+        chain = [title]
+        frames = [(iter(topic.get_steps() or []), [])]
+        while len(frames) > 0:
+            steps, plan = frames[-1]
+            for step in steps:
+                if step.get_statement() is not InvokeTopic:
+                    plan.append(step)
+                    continue
+                name = step.get_kwarguments().get("topic", "")
+                invoked = guide.get_topic_by_title(name)
+                if invoked is None:
+                    continue
+                key = invoked.get_title().lower()
+                if key in plans:
+                    plan.extend(plans[key])
+                    continue
+                if key in chain:
+                    circle = " -> ".join(chain[chain.index(key):] + [key])
+                    raise ValueError("Circular topic invoke: %s" % circle)
+                chain.append(key)
+                frames.append((iter(invoked.get_steps() or []), []))
+                break
+            else:
+                frames.pop()
+                plans[chain.pop()] = plan
+                if len(frames) > 0:
+                    frames[-1][1].extend(plan)
+        return plans[title]
+
+    def pair_steps(self, topic):
+        """Check if all topic steps are paired.
+
+        Returns:
+            bool: True if every step has a statement.
+        """
+
+        steps = topic.get_steps() or []
+        return all([s.get_statement() is not None for s in steps])
+
+    def batch_steps(self, steps):
+        """Merge consecutive steps of the same statement.
+
+        Only statements that know how to merge their arguments are batched
+        (e.g. package installs). Steps with payload are never merged.
+
+        Args:
+            steps (list): List of topic steps.
+
+        Returns:
+            list: List of steps, with merged steps replacing their batch.
+        """
+
+        batched, group = [], []
+
+        def flush():
+            merged = None
+            if len(group) > 1:
+                merged = self.merge_steps(group)
+            if merged is None:
+                batched.extend(group)
+            else:
+                batched.append(merged)
+            del group[:]
+
+        for step in steps:
+            if step.get_punctuation() == Instruction.RunType.ARGS:
+                flush()
+                batched.append(step)
+                continue
+            if len(group) > 0 and \
+                    step.get_statement() is not group[0].get_statement():
+                flush()
+            group.append(step)
+        flush()
+        if len(batched) < len(steps):
+            Log.info("Merged %d steps into %d" % (len(steps), len(batched)))
+        return batched
+
+    def merge_steps(self, steps):
+        """Merge a batch of steps into a new step.
+
+        Args:
+            steps (list): Consecutive steps of the same statement.
+
+        Returns:
+            mixt: New step, or None if statement cannot merge steps.
+        """
 
-        Returns an empty list if nothing is found.
+        action = steps[0].get_statement()
+        kwargs = action.batch([s.get_kwarguments() or {} for s in steps])
+        if kwargs is None:
+            return None
+        punct = Instruction.RunType.END
+        if any(s.get_punctuation() == Instruction.RunType.AND for s in steps):
+            punct = Instruction.RunType.AND
+        text = u" + ".join(s.get_step() for s in steps)
+        step = Instruction(steps[0].get_position(), text, punct)
+        step.set_description(steps[0].get_description())
+        step.set_statement(action)
+        # Keep positional arguments in expression order, as converters use
+        match, _ = Statement.lookup(steps[0].get_step())
+        groups = match.re.groupindex
+        names = sorted(groups, key=groups.get)
+        step.set_arguments(tuple(kwargs.get(n) for n in names))
+        step.set_kwarguments(kwargs)
+        return step
+
+    def find_guide_topic(self, title, ignore_case=False):
+        """Lookup a topic of guide by title.
+
+        Args:
+            title        (str): Topic title.
+            ignore_case (bool): Match title case-insensitive.
+
+        Returns:
+            mixt: Topic instance or None if not found.
         """
 
-        for topic in Topic.get_all_topics():
-            if topic_name.lower() == topic.get_title().lower():
-                return topic.get_steps()
-        return []
+        if ignore_case:
+            title = title.lower()
+        for topic in self.guide_topics:
+            each = topic.get_title()
+            if (each.lower() if ignore_case else each) == title:
+                return topic
+        return None
 
     def get_user_input(self, attempt=0):
         """Prompt user to choose a topic from a list.
@@ -358,3 +907,5 @@ class Script(object):
 
         Log.info("Preparing to print report...")
         Report.output()
+        if self.args.report_json is not None:
+            Report.export(self.args.report_json)
@@ -18,115 +18,332 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import json
+import os
+
+from hashlib import sha1
+from importlib import import_module
 from re import compile, IGNORECASE, UNICODE
 
-from buildok.statements.chdir import ChangeDir
-from buildok.statements.mkdir import MakeDir
-from buildok.statements.symlink import MakeSymlink
-from buildok.statements.web import ViewWeb
-from buildok.statements.google import GoogleSearch
-from buildok.statements.duckduckgo import DuckDuckGoSearch
-from buildok.statements.wikipedia import WikipediaSearch
-from buildok.statements.github_search import GitHubSearch
-from buildok.statements.shell import ShellExec
-from buildok.statements.chmod import ChangeMod
-from buildok.statements.chown import ChangeOwner
-from buildok.statements.kill import KillProcess
-from buildok.statements.copy import Copy
-from buildok.statements.move import Move
-from buildok.statements.remove import Remove
-from buildok.statements.touch import Touch
-from buildok.statements.edit_file import EditFile
-from buildok.statements.install_pip import PipInstallPackage
-from buildok.statements.install_npm import NpmInstallPackage
-from buildok.statements.install import InstallPackage
-from buildok.statements.uninstall import UninstallPackage
-from buildok.statements.reinstall import ReinstallPackage
-from buildok.statements.service_enable import EnableService
-from buildok.statements.service_disable import DisableService
-from buildok.statements.service_status import StatusService
-from buildok.statements.service_start import StartService
-from buildok.statements.service_stop import StopService
-from buildok.statements.service_restart import RestartService
-from buildok.statements.service_reload import ReloadService
-from buildok.statements.listdir import ListDir
-from buildok.statements.invoke import InvokeTopic
-from buildok.statements.noop import Noop
+from buildok.version import __version__
+from buildok import __build__
 
+from buildok.util.state import state_path
 from buildok.util.log import Log
 
 
+class LazyAction(object):
+    """Manifest entry of an action handler.
+
+    Holds everything needed to match a statement without importing the
+    action module. The module is imported the first time the action is
+    actually needed.
+
+    Args:
+        module      (str): Module path of action handler.
+        name        (str): Class name of action handler.
+        description (str): First line of action docstring.
+    """
+
+    def __init__(self, module, name, description):
+        self.module = module
+        self.name = name
+        self.description = description
+
+    def load(self):
+        """Import action handler.
+
+        Returns:
+            Action: Action handler class.
+        """
+
+        return getattr(import_module(self.module), self.name)
+
+    def parse_description(self):
+        """Action handler description.
+
+        Returns:
+            str: Description stored in manifest.
+        """
+
+        return self.description
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return "%s.%s" % (self.module, self.name)
+
+
 class Statement(object):
     """Statement parser and launcher.
 
+    Statements are read from a manifest cached in the state directory, so
+    action modules are imported only when a step pairs with them. The
+    manifest is rebuilt from action docstrings whenever any module from
+    `buildok.statements` changes.
+
     Attributes:
-        actions (frozen set): Set of all known statements and actions.
-        statements    (list): List of all statements.
-        ready         (bool): Setup flag to determine status.
+        actions    (tuple): Module and class name of all known actions.
+        statements  (dict): Statements mapped to lazy actions.
+        expressions (dict): Compiled expressions of matched statements.
+        manifest    (list): List of statement, module, class, description.
+        signature    (str): Hash of statement modules and buildok version.
+        ready       (bool): Setup flag to determine status.
     """
 
-    __actions = {
-        ChangeDir,          # Change current working directory.
-        MakeDir,            # Make a directory or make recursive directories.
-        MakeSymlink,        # Make a symlink for a target source
-        ViewWeb,            # Open a link in default browser.
-        GoogleSearch,       # Perform a Google search and open default browser.
-        DuckDuckGoSearch,   # Perform a DuckDuckGo search and open browser.
-        WikipediaSearch,    # Perform a Wikipedia search and open browser.
-        GitHubSearch,       # Open a GitHub search in default browser.
-        ShellExec,          # Run a command in shell.
-        ChangeMod,          # Change permissions on file or directory.
-        ChangeOwner,        # Change owner and group on file or directory.
-        Copy,               # Copy files from source to destination.
-        Move,               # Move files from source to destination.
-        Remove,             # Remove files from a given source.
-        KillProcess,        # Send SIGTERM signal to a process.
-        Touch,              # Create a new file.
-        EditFile,           # Edit content of an existing file.
-        PipInstallPackage,  # Install Python packages.
-        NpmInstallPackage,  # Install Node.js packages.
-        InstallPackage,     # Install new package software.
-        UninstallPackage,   # Uninstall package software.
-        ReinstallPackage,   # Reinstall package software.
-        InvokeTopic,        # Invoke new topic from guide.
-        Noop,               # No operation; nothing to do.
-        EnableService,      # Enable service at boot time.
-        DisableService,     # Disable service at boot time.
-        StatusService,      # Get status of service.
-        StartService,       # Start new service.
-        StopService,        # Stop running service.
-        RestartService,     # Restart running service.
-        ReloadService,      # Reload service configuration.
-        ListDir,            # List files and directories from directory.
-    }
+    package = r"buildok.statements"
+
+    __actions = (
+        ("chdir", "ChangeDir"),                 # Change working directory.
+        ("mkdir", "MakeDir"),                   # Make a directory.
+        ("symlink", "MakeSymlink"),             # Make a symlink.
+        ("web", "ViewWeb"),                     # Open a link in browser.
+        ("google", "GoogleSearch"),             # Perform a Google search.
+        ("duckduckgo", "DuckDuckGoSearch"),     # Perform a DuckDuckGo search.
+        ("wikipedia", "WikipediaSearch"),       # Perform a Wikipedia search.
+        ("github_search", "GitHubSearch"),      # Open a GitHub search.
+        ("shell", "ShellExec"),                 # Run a command in shell.
+        ("chmod", "ChangeMod"),                 # Change permissions.
+        ("chmod", "ChangeModRecursive"),        # Change permissions of tree.
+        ("chown", "ChangeOwner"),               # Change owner and group.
+        ("chown", "ChangeOwnerRecursive"),      # Change owner of tree.
+        ("copy", "Copy"),                       # Copy files.
+        ("move", "Move"),                       # Move files.
+        ("remove", "Remove"),                   # Remove files.
+        ("kill", "KillProcess"),                # Send SIGTERM to a process.
+        ("touch", "Touch"),                     # Create a new file.
+        ("edit_file", "EditFile"),              # Edit content of a file.
+        ("install_pip", "PipInstallPackage"),   # Install Python packages.
+        ("install_npm", "NpmInstallPackage"),   # Install Node.js packages.
+        ("install", "InstallPackage"),          # Install package software.
+        ("uninstall", "UninstallPackage"),      # Uninstall package software.
+        ("reinstall", "ReinstallPackage"),      # Reinstall package software.
+        ("invoke", "InvokeTopic"),              # Invoke new topic from guide.
+        ("noop", "Noop"),                       # No operation.
+        ("service_enable", "EnableService"),    # Enable service at boot.
+        ("service_disable", "DisableService"),  # Disable service at boot.
+        ("service_status", "StatusService"),    # Get status of service.
+        ("service_start", "StartService"),      # Start new service.
+        ("service_stop", "StopService"),        # Stop running service.
+        ("service_restart", "RestartService"),  # Restart running service.
+        ("service_reload", "ReloadService"),    # Reload service configuration.
+        ("listdir", "ListDir"),                 # List files from directory.
+        ("disk_usage", "DiskUsage"),            # Show disk usage of files.
+    )
+
+    manifest_file = r"manifest.json"
 
     statements = {}
+    expressions = {}
+    dispatcher = {}
+    fallback = []
+    manifest = []
+    signature = None
     ready = False
 
+    keyword = compile(
+        r"^\^(?:\(\?:(?P<words>[a-z]+(?:\|[a-z]+)*)\)|(?P<word>[a-z]+))"
+        r"(?= |\\s|\$)", IGNORECASE
+    )
+
     @classmethod
     def prepare(cls):
         """Statement initialization.
 
-        Loops through all supported actions, validates and maps statements with
-        actions.
+        Loads the statements manifest (or builds it from all supported
+        actions), validates and maps statements with lazy actions.
 
         Returns:
             bool: True if statements are mapped successful.
         """
 
+        cls.signature = cls.get_signature()
+        cls.manifest = cls.load_manifest(cls.signature)
+        if cls.manifest is None:
+            cls.manifest = cls.build_manifest()
+            cls.save_manifest(cls.signature, cls.manifest)
+        Log.debug("Preparing to map %d statements" % len(cls.manifest))
+        actions = {}
+        for line, module, name, description in cls.manifest:
+            action = actions.get((module, name))
+            if action is None:
+                action = LazyAction(module, name, description)
+                actions.update({(module, name): action})
+            cls.statements.update({line: action})
+            Log.debug("Updating known patterns: %s" % line)
+        if len(actions) < len(cls.__actions):
+            raise SystemExit("Unable to map statements to action")
+        cls.build_dispatcher()
+        cls.ready = True
+        Log.debug("All statements are scanned")
+
+    @classmethod
+    def get_signature(cls):
+        """Compute signature of statement modules.
+
+        Uses names, sizes and modification times of all modules from the
+        statements package, so no module has to be imported.
+
+        Returns:
+            str: Hexadecimal signature.
+        """
+
+        hasher = sha1()
+        hasher.update(__version__)
+        hasher.update(__build__)
+        folder = os.path.join(os.path.dirname(__file__), "statements")
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(".py"):
+                continue
+            meta = os.stat(os.path.join(folder, filename))
+            hasher.update("%s:%d:%d" % (filename, meta.st_size, meta.st_mtime))
+        return hasher.hexdigest()
+
+    @classmethod
+    def build_manifest(cls):
+        """Import all actions and extract their statements.
+
+        Returns:
+            list: List of statement, module, class name and description.
+        """
+
+        manifest = []
         Log.debug("Preparing to scan %d actions" % len(cls.__actions))
-        for action in cls.__actions:
+        for module, name, action in cls.load_actions():
             if not callable(action):
                 raise SystemExit("Expected action to be callable")
-            Log.debug("Scanning action: %s" % action.parse_description())
+            description = action.parse_description()
+            Log.debug("Scanning action: %s" % description)
             for line in action.parse_statements():
-                exp = compile(line.strip(), IGNORECASE | UNICODE)
-                cls.statements.update({exp: action})
-                Log.debug("Updating known patterns: %s" % exp.pattern)
-        if len(cls.statements) < len(cls.__actions):
-            raise SystemExit("Unable to map statements to action")
-        cls.ready = True
-        Log.debug("All statements are scanned")
+                manifest.append((line.strip(), module, name, description))
+        return manifest
+
+    @classmethod
+    def load_manifest(cls, signature):
+        """Load statements manifest from state directory.
+
+        Args:
+            signature (str): Expected signature of manifest.
+
+        Returns:
+            mixt: List of manifest entries or None if missing or outdated.
+        """
+
+        try:
+            filepath = state_path(cls.manifest_file)
+            if not os.path.isfile(filepath):
+                return None
+            with open(filepath, "r") as file_:
+                data = json.load(file_)
+            if data.get("signature") == signature:
+                return [tuple(e) for e in data.get("statements")]
+        except Exception as e:
+            Log.debug("Ignoring broken manifest: %s" % e)
+        return None
+
+    @classmethod
+    def save_manifest(cls, signature, manifest):
+        """Save statements manifest to state directory.
+
+        Args:
+            signature (str): Signature of manifest.
+            manifest (list): List of manifest entries.
+        """
+
+        try:
+            filepath = state_path(cls.manifest_file)
+            tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+            with open(tmp_filepath, "w") as file_:
+                data = {"signature": signature, "statements": manifest}
+                json.dump(data, file_, indent=1)
+            os.rename(tmp_filepath, filepath)
+        except Exception as e:
+            Log.debug("Cannot save manifest: %s" % e)
+
+    @classmethod
+    def load_actions(cls):
+        """Import all supported actions.
+
+        Returns:
+            list: List of module path, class name and action handler.
+        """
+
+        actions = []
+        for module, name in cls.__actions:
+            module_path = "%s.%s" % (cls.package, module)
+            action = getattr(import_module(module_path), name)
+            actions.append((module_path, name, action))
+        return actions
+
+    @classmethod
+    def build_dispatcher(cls):
+        """Index statements by their leading keyword.
+
+        Most statements start with a literal word (e.g. "install", "copy") or
+        a group of literal words (e.g. "kill" or "stop"). These are indexed
+        by their keyword, so a step is matched only against statements
+        sharing its first word. Statements without a literal keyword are
+        tried for every step. Inside each bucket longer expressions are tried
+        first, preferring the most specific statement. Expressions are
+        compiled only when first needed.
+        """
+
+        indexed, cls.fallback = {}, []
+        for line, action in cls.statements.iteritems():
+            scan = cls.keyword.match(line)
+            if scan is None:
+                cls.fallback.append((line, action))
+                continue
+            words = scan.group("words") or scan.group("word")
+            for word in words.lower().split("|"):
+                indexed.setdefault(word, []).append((line, action))
+
+        def by_length(pair):
+            return -len(pair[0])
+
+        cls.fallback.sort(key=by_length)
+        cls.dispatcher = {}
+        for word, pairs in indexed.iteritems():
+            cls.dispatcher[word] = sorted(pairs, key=by_length) + cls.fallback
+        Log.debug("Indexed %d keywords and %d fallback statements" % (
+            len(cls.dispatcher), len(cls.fallback)))
+
+    @classmethod
+    def lookup(cls, step):
+        """Match a step against known statements.
+
+        Args:
+            step (str): Text string of step.
+
+        Returns:
+            tuple: Match object and lazy action, or (None, None).
+        """
+
+        words = step.split(None, 1)
+        keyword = words[0].lower() if len(words) > 0 else ""
+        for line, action in cls.dispatcher.get(keyword, cls.fallback):
+            args = cls.compile(line).match(step)
+            if args is not None:
+                return args, action
+        return None, None
+
+    @classmethod
+    def compile(cls, line):
+        """Compile statement expression once.
+
+        Args:
+            line (str): Statement expression.
+
+        Returns:
+            RegEx: Compiled expression.
+        """
+
+        exp = cls.expressions.get(line)
+        if exp is None:
+            exp = compile(line, IGNORECASE | UNICODE)
+            cls.expressions.update({line: exp})
+        return exp
 
     @classmethod
     def find_statement(cls, stmt):
@@ -153,17 +370,29 @@ class Statement(object):
         """Statetements getter.
 
         Returns:
-            iterator: A key-value itertator of all statements.
+            iterator: A key-value itertator of all compiled statements.
         """
 
-        return cls.statements.iteritems()
+        return ((cls.compile(l), a) for l, a in cls.statements.iteritems())
+
+    @classmethod
+    def get_patterns(cls):
+        """Statement expressions getter.
+
+        Returns:
+            list: Text of all statement expressions from manifest.
+        """
+
+        return [line for line, _, _, _ in cls.manifest]
 
     @classmethod
     def get_actions(cls):
         """Actions getter.
 
+        Imports every action module; use only when all actions are needed.
+
         Returns:
             list: All supported actions.
         """
 
-        return cls.__actions
+        return [action for _, _, action in cls.load_actions()]
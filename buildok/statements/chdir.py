@@ -46,6 +46,8 @@ class ChangeDir(Action):
         Changed directory => /tmp
     """
 
+    cacheable = False
+
     def run(self, path=None, *args, **kwargs):
         if path is None:
             path = "."
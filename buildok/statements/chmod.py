@@ -19,8 +19,10 @@
 # THE SOFTWARE.
 
 from os import chmod, getcwd, path as fpath
+from stat import S_IMODE, S_ISLNK
 
 from buildok.action import Action
+from buildok.util.fs import TreeChange
 
 
 class ChangeMod(Action):
@@ -62,6 +64,10 @@ class ChangeMod(Action):
         except TypeError as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, mode="400", path=None, *args, **kwargs):
+        return [path or "."]
+
     @classmethod
     def convert_shell(cls, mode="400", path=None, *args, **kwargs):
         if path is None:
@@ -70,3 +76,55 @@ class ChangeMod(Action):
         if fpath.isdir(path):
             flags = " -R"
         return "chmod%s %s %s" % (flags, mode, path)
+
+
+class ChangeModRecursive(ChangeMod):
+    r"""Change permissions on directory and everything in it.
+
+    Entries that already have the permissions are left untouched. Symlinks
+    are skipped, as their permissions cannot be changed.
+
+    Args:
+        mode (str): Octal integer permissions.
+        path (str): Path to file or directory.
+
+    Retuns:
+        str: Human readable descriptor message or error.
+
+    Raises:
+        OSError: If an invalid `path` is provided.
+        TypeError: If an invalid `mode` is provided.
+
+    Accepted statements:
+        ^change permissions to `(?P<mode>.+)` recursively for `(?P<path>.+)`$
+        ^set permissions (?:to )?`(?P<mode>.+)` recursively for `(?P<path>.+)`$
+
+    Sample input:
+        - Create folder `/tmp/buildok_tree`.
+        - Run `touch /tmp/buildok_tree/buildok_test.txt`.
+        - Set permissions to `700` recursively for `/tmp/buildok_tree`.
+
+    Expected:
+        Changed permissions 700 => /tmp/buildok_tree (2 changed, 0 untouched)
+    """
+
+    def run(self, mode="400", path=None, *args, **kwargs):
+        if path is None:
+            path = getcwd()
+        try:
+            perms = int(mode, 8)
+            tree = TreeChange(lambda meta: not S_ISLNK(meta.st_mode) and
+                              S_IMODE(meta.st_mode) != perms,
+                              lambda entry: chmod(entry, perms))
+            tree.apply(path)
+            self.success("Changed permissions %s => %s (%d changed, "
+                         "%d untouched)" % (mode, path, tree.changed,
+                                            tree.untouched))
+        except OSError as e:
+            self.fail(str(e))
+        except TypeError as e:
+            self.fail(str(e))
+
+    @classmethod
+    def convert_shell(cls, mode="400", path=None, *args, **kwargs):
+        return "chmod -R %s %s" % (mode, path or ".")
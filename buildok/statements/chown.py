@@ -18,7 +18,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from os import chown, getcwd, path as fpath
+from os import chown, lchown, getcwd, path as fpath
 
 try:
     from pwd import getpwnam
@@ -28,6 +28,7 @@ except ImportError:
     getgrnam = type("getgrnam", (object,), dict(gr_gid=-1))
 
 from buildok.action import Action
+from buildok.util.fs import TreeChange
 
 
 class ChangeOwner(Action):
@@ -60,28 +61,58 @@ class ChangeOwner(Action):
     """
 
     def run(self, owner="", group="", path=None, *args, **kwargs):
-        if owner != "":
-            uid = getpwnam(owner).pw_uid
-        else:
-            uid = -1
-        if group != "":
-            gid = getgrnam(group).gr_gid
-        else:
-            gid = -1
+        uid, gid = self.get_ids(owner, group)
         if path is None:
             path = getcwd()
         try:
             chown(path, uid, gid)
-            if uid != -1 and gid == -1:
-                self.success("Changed owner %s => %s" % (owner, path))
-            elif uid == -1 and gid != -1:
-                self.success("Changed group %s => %s" % (group, path))
-            elif uid != -1 and gid != -1:
-                values = (owner, group, path)
-                self.success("Changed ownwer:group %s:%s => %s" % values)
+            status = self.describe_change(owner, group, path)
+            if status is not None:
+                self.success(status)
         except OSError as e:
             self.fail(str(e))
 
+    @staticmethod
+    def get_ids(owner, group):
+        """Lookup user and group IDs.
+
+        Args:
+            owner (str): User name or empty string.
+            group (str): Group name or empty string.
+
+        Returns:
+            tuple: User and group ID, -1 for those not given.
+        """
+
+        uid = getpwnam(owner).pw_uid if owner else -1
+        gid = getgrnam(group).gr_gid if group else -1
+        return uid, gid
+
+    @staticmethod
+    def describe_change(owner, group, path):
+        """Describe a change of owner and group.
+
+        Args:
+            owner (str): User name or empty string.
+            group (str): Group name or empty string.
+            path  (str): Path to file or directory.
+
+        Returns:
+            mixt: Status message or None if nothing was changed.
+        """
+
+        if owner and not group:
+            return "Changed owner %s => %s" % (owner, path)
+        elif group and not owner:
+            return "Changed group %s => %s" % (group, path)
+        elif owner and group:
+            return "Changed ownwer:group %s:%s => %s" % (owner, group, path)
+        return None
+
+    @classmethod
+    def resources(cls, owner="", group="", path=None, *args, **kwargs):
+        return [path or "."]
+
     @classmethod
     def convert_shell(cls, owner=None, group=None, path=None, *args, **kwargs):
         if path is None:
@@ -96,3 +127,58 @@ class ChangeOwner(Action):
         elif owner is not None and group is None:
             return "chown%s %s %s" % (flags, owner, path)
         return 'echo "cannot chown: missing owner and/or group"'
+
+
+class ChangeOwnerRecursive(ChangeOwner):
+    r"""Change owner and group on directory and everything in it.
+
+    Entries that already have the owner and group are left untouched.
+    Symlinks are changed themselves, never their targets.
+
+    Args:
+        owner (str): User name, or user and group as "user:group".
+        group (str): Group name.
+        path (str): Path to file or directory.
+
+    Retuns:
+        str: Human readable descriptor message or error.
+
+    Raises:
+        OSError: If an invalid `path` is provided.
+
+    Accepted statements:
+        ^change owner to `(?P<owner>.+)` recursively on `(?P<path>.+)`$
+        ^set owner `(?P<owner>.+)` recursively for `(?P<path>.+)`$
+        ^set group `(?P<group>.+)` recursively for `(?P<path>.+)`$
+
+    Sample input:
+        - Create folder `/tmp/buildok_tree`.
+        - Run `touch /tmp/buildok_tree/buildok_test.txt`.
+        - Set owner `nobody` recursively for `/tmp/buildok_tree`.
+
+    Expected:
+        Changed owner nobody => /tmp/buildok_tree (2 changed, 0 untouched)
+    """
+
+    def run(self, owner="", group="", path=None, *args, **kwargs):
+        owner, group = owner or "", group or ""
+        if ":" in owner and not group:
+            owner, group = owner.split(":", 1)
+        uid, gid = self.get_ids(owner, group)
+        if path is None:
+            path = getcwd()
+        try:
+            tree = TreeChange(lambda meta: uid not in (-1, meta.st_uid) or
+                              gid not in (-1, meta.st_gid),
+                              lambda entry: lchown(entry, uid, gid))
+            tree.apply(path)
+            status = self.describe_change(owner, group, path)
+            if status is not None:
+                self.success("%s (%d changed, %d untouched)" % (
+                    status, tree.changed, tree.untouched))
+        except OSError as e:
+            self.fail(str(e))
+
+    @classmethod
+    def convert_shell(cls, owner=None, group=None, path=None, *args, **kwargs):
+        return ChangeOwner.convert_shell(owner, group, path, flags=" -R")
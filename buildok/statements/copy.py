@@ -20,15 +20,17 @@
 
 from os import path as path
 from glob import glob
-from shutil import copy
-from distutils.dir_util import copy_tree
 
 from buildok.action import Action
+from buildok.util.fs import TreeCopy
 
 
 class Copy(Action):
     r"""Copy files from a given source to a given destination.
 
+    Files already up to date (same size and modification time) are skipped,
+    so copying the same tree again is nearly instant.
+
     Args:
         src (str): Source of files.
         dst (str): Target destination of files.
@@ -54,14 +56,22 @@ class Copy(Action):
 
     def run(self, src=None, dst=None, *args, **kwargs):
         files, folders = 0, 0
+        tree = TreeCopy()
         for item in glob(src):
             if path.isfile(item):
-                copy(item, dst)
+                tree.copy_file(item, dst)
                 files += 1
             elif path.isdir(item):
-                copy_tree(item, dst)
+                tree.copy_tree(item, dst)
                 folders += 1
-        self.success("Copied => %d file(s) %d dir(s)" % (files, folders))
+        status = "Copied => %d file(s) %d dir(s)" % (files, folders)
+        if tree.skipped > 0:
+            status += " (%d up to date)" % tree.skipped
+        self.success(status)
+
+    @classmethod
+    def resources(cls, src=None, dst=None, *args, **kwargs):
+        return [src, dst]
 
     @classmethod
     def convert_shell(cls, src=None, dst=None, *args, **kwargs):
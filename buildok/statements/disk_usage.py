@@ -0,0 +1,153 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from multiprocessing.pool import ThreadPool
+from os import getcwd, path as fpath
+from stat import S_ISDIR
+
+from buildok.statements.listdir import ListDir
+from buildok.util.fs import scan_dir, sizeof_fmt, tree_size
+
+
+class DiskUsage(ListDir):
+    r"""Show disk usage of files and folders in directory.
+
+    Sizes of folders are computed recursively, on a pool of threads when
+    there are enough folders. Rows can be sorted by name or size, or limited
+    to the largest entries.
+
+    Args:
+        path  (str): Path to directory.
+        sort  (str): Sort rows by "name" or "size".
+        limit (str): Show only the largest entries.
+
+    Retuns:
+        str: Human readable descriptor message or error.
+
+    Raises:
+        OSError: If an invalid `path` is provided.
+
+    Accepted statements:
+        ^disk usage (?:of|for|in) `(?P<path>.+)`$
+        ^disk usage (?:of|for|in) `(?P<path>.+)` sorted by (?P<sort>name|size)$
+        ^show (?P<limit>\d+) largest (?:entries|files) in `(?P<path>.+)`$
+
+    Sample input:
+        - Disk usage of `/tmp`.
+
+    Expected:
+        Disk usage => /tmp
+    """
+
+    workers = 8
+    threshold = 4
+
+    def run(self, path=None, sort=None, limit=None, *args, **kwargs):
+        if path is None:
+            path = getcwd()
+        if limit is not None:
+            limit, sort = int(limit), sort or "size"
+        try:
+            fullpath = fpath.abspath(path)
+            entries = list(scan_dir(fullpath))
+            self.success("Disk usage => %s" % fullpath)
+            self.print_header()
+            folders = len([e for e in entries if S_ISDIR(e[2].st_mode)])
+            if folders < self.threshold:
+                rows = map(self.get_usage, entries)
+                total = self.print_rows(rows, sort, limit)
+            else:
+                pool = ThreadPool(min(self.workers, folders))
+                try:
+                    rows = pool.imap(self.get_usage, entries)
+                    total = self.print_rows(rows, sort, limit)
+                finally:
+                    pool.close()
+                    pool.join()
+            self.print_delimiter()
+            self.print_row(" ", "Total", sizeof_fmt(total))
+            self.print_delimiter()
+        except Exception as e:
+            self.fail(str(e))
+
+    def print_rows(self, rows, sort=None, limit=None):
+        """Print rows as they are computed, or sorted once all are known.
+
+        Args:
+            rows (iterator): Type, name and size of entries.
+            sort      (str): Sort key.
+            limit     (int): Maximum number of rows printed.
+
+        Returns:
+            int: Total size of all entries.
+        """
+
+        total = 0
+        if sort is not None:
+            rows = self.sort_rows(rows, sort)
+            total = sum(row[2] for row in rows)
+            rows = rows[:limit]
+        for f_type, f_name, f_size in rows:
+            self.print_row(f_type, f_name, sizeof_fmt(f_size))
+            if sort is None:
+                total += f_size
+        return total
+
+    def get_usage(self, entry):
+        """Compute size of an entry.
+
+        Args:
+            entry (tuple): Name, path and status of entry.
+
+        Returns:
+            tuple: Type, name and size of entry.
+        """
+
+        name, entry_path, meta = entry
+        if S_ISDIR(meta.st_mode):
+            return "d", name, tree_size(entry_path)
+        return self.get_file_type(meta.st_mode), name, meta.st_size
+
+    @staticmethod
+    def sort_rows(rows, sort):
+        """Sort rows by name or by size, largest first.
+
+        Args:
+            rows (iterator): Type, name and size of entries.
+            sort      (str): Sort key.
+
+        Returns:
+            list: Sorted rows.
+        """
+
+        if sort == "name":
+            return sorted(rows, key=lambda row: row[1])
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    @classmethod
+    def convert_shell(cls, path=None, sort=None, limit=None, *args, **kwargs):
+        if path is None:
+            path = "."
+        cmd = "du -sh %s/*" % path
+        if limit is not None:
+            return "%s | sort -rh | head -n %s" % (cmd, limit)
+        if sort == "size":
+            return "%s | sort -rh" % cmd
+        return cmd
@@ -44,7 +44,7 @@ class EditFile(Action):
         ```
 
     Expected:
-        Changed 1 line(s) of content => /tmp/buildok.txt
+        Changed 1 line(s) of content => buildok.txt
     """
 
     def run(self, filepath=None, *args, **kwargs):
@@ -58,6 +58,10 @@ class EditFile(Action):
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, filepath=None, *args, **kwargs):
+        return [filepath]
+
     @classmethod
     def convert_shell(cls, filepath=None, *args, **kwargs):
         if filepath is None:
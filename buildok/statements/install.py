@@ -18,13 +18,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from subprocess import Popen
-from time import sleep
 from shlex import split as cmd_split
 
 from buildok.action import Action
 
+from buildok.util.capture import Capture
 from buildok.util.log import Log
+from buildok.util.packages import PackageIndex
+from buildok.util.process import Process
 
 
 class InstallPackage(Action):
@@ -49,6 +50,14 @@ class InstallPackage(Action):
         Installed 2 new packages
     """
 
+    lock = r"packages"
+    marks_installed = True
+
+    # Packages live outside the project and may change behind buildok's
+    # back, so package steps always run; already installed packages are
+    # skipped by the package index anyway
+    cacheable = False
+
     os_packs = {
         ("alpine",):            "apk add {packages}",
         ("debian", "ubuntu"):   "apt-get install -y {packages}",
@@ -67,14 +76,25 @@ class InstallPackage(Action):
             cmd = InstallPackage.check_install()
             if cmd is None:
                 return self.fail("Unsupported OS: %s" % self.env.os_name)
-            installed_pkgs = self.install_packages(cmd, packages)
-            if installed_pkgs > 0:
+            missing = self.skip_packages(packages, installed=True)
+            skipped = len(packages) - len(missing)
+            if len(missing) == 0:
+                return self.success("Already installed %d packages" % skipped)
+            installed_pkgs = self.install_packages(cmd, missing)
+            if installed_pkgs > 0 and skipped > 0:
+                status = (installed_pkgs, skipped)
+                self.success("Installed %d new packages (%d skipped)" % status)
+            elif installed_pkgs > 0:
                 self.success("Installed %d new packages" % installed_pkgs)
             else:
                 self.fail("Failed to install packages...")
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, pkgs=None, *args, **kwargs):
+        return []
+
     @classmethod
     def convert_shell(cls, pkgs=None, *args, **kwargs):
         if pkgs is None:
@@ -91,16 +111,56 @@ class InstallPackage(Action):
                 return cmd
         return None
 
+    @classmethod
+    def batch(cls, batch):
+        packages = []
+        for kwargs in batch:
+            for pkg in (kwargs.get("pkgs") or "").split():
+                if pkg not in packages:
+                    packages.append(pkg)
+        return {"pkgs": " ".join(packages)}
+
+    def skip_packages(self, packages, installed):
+        # Leave out packages already in the wanted state, as far as the
+        # index of installed packages can tell
+        os_name = self.env.os_name
+        return [p for p in packages
+                if PackageIndex.is_installed(os_name, p) is not installed]
+
     def install_packages(self, cmd, packages):
-        installed = 0
+        done = self.run_transaction(cmd, packages, self.env.os_name)
+        if self.marks_installed:
+            PackageIndex.add(done)
+        else:
+            PackageIndex.remove(done)
+        return len(done)
+
+    @staticmethod
+    def run_install(install_cmd):
+        # Output of the package manager is shown as it runs, while only its
+        # tail is kept in memory
+        return Process.run(install_cmd, on_line=Process.show_line,
+                           capture=Capture("install")).returncode
+
+    @classmethod
+    def run_transaction(cls, cmd, packages, label):
+        # Install all packages in one transaction, so the package manager
+        # resolves dependencies and locks its database only once; retry one
+        # package at a time only if the transaction fails
+        install_cmd = cmd_split(cmd.format(packages=" ".join(packages)))
+        output = cls.run_install(install_cmd)
+        Log.debug("Running (%s) %s ... %r" % (label, install_cmd, output == 0))
+        if 0 == output:
+            return packages
+        if len(packages) < 2:
+            return []
+        Log.debug("Retrying (%s) one package at a time" % label)
+        installed = []
         for pkg in packages:
             install_cmd = cmd_split(cmd.format(packages=pkg))
-            install_output = Popen(install_cmd)
-            while install_output.poll() is None:
-                sleep(0.5)
-            output = install_output.returncode
-            log_status = (self.env.os_name, install_cmd, output == 0)
+            output = cls.run_install(install_cmd)
+            log_status = (label, install_cmd, output == 0)
             Log.debug("Running (%s) %s ... %r" % log_status)
             if 0 == output:
-                installed += 1
+                installed.append(pkg)
         return installed
@@ -18,13 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from subprocess import Popen
-from time import sleep
-from shlex import split as cmd_split
-
 from buildok.action import Action
-
-from buildok.util.log import Log
+from buildok.statements.install import InstallPackage
 
 
 class NpmInstallPackage(Action):
@@ -49,6 +44,8 @@ class NpmInstallPackage(Action):
         Installed 2 Node.js package(s)
     """
 
+    lock = r"npm"
+
     def run(self, pkgs=None, *args, **kwargs):
         packages = pkgs.split()
         if len(packages) == 0:
@@ -63,6 +60,14 @@ class NpmInstallPackage(Action):
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, pkgs=None, *args, **kwargs):
+        return ["node_modules", "package.json"]
+
+    @classmethod
+    def batch(cls, batch):
+        return InstallPackage.batch(batch)
+
     @classmethod
     def convert_shell(cls, pkgs=None, *args, **kwargs):
         if pkgs is None:
@@ -70,14 +75,4 @@ class NpmInstallPackage(Action):
         return "npm install %s" % pkgs
 
     def install_packages(self, cmd, packages):
-        installed = 0
-        for pkg in packages:
-            install_cmd = cmd_split(cmd.format(packages=pkg))
-            install_output = Popen(install_cmd)
-            while install_output.poll() is None:
-                sleep(0.5)
-            output = install_output.returncode
-            Log.debug("Running (npm) %s ... %r" % (install_cmd, output == 0))
-            if 0 == output:
-                installed += 1
-        return installed
+        return len(InstallPackage.run_transaction(cmd, packages, "npm"))
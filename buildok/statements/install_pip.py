@@ -18,13 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from subprocess import Popen
-from time import sleep
-from shlex import split as cmd_split
-
 from buildok.action import Action
-
-from buildok.util.log import Log
+from buildok.statements.install import InstallPackage
 
 
 class PipInstallPackage(Action):
@@ -50,6 +45,11 @@ class PipInstallPackage(Action):
         Installed 1 Python package(s)
     """
 
+    # Packages live outside the project, so pip steps always run
+    cacheable = False
+
+    lock = r"pip"
+
     def run(self, pkgs=None, deps=None, *args, **kwargs):
         if deps is not None and pkgs is None:
             try:
@@ -72,6 +72,16 @@ class PipInstallPackage(Action):
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, pkgs=None, deps=None, *args, **kwargs):
+        return []
+
+    @classmethod
+    def batch(cls, batch):
+        if any(kwargs.get("deps") is not None for kwargs in batch):
+            return None
+        return InstallPackage.batch(batch)
+
     @classmethod
     def convert_shell(cls, pkgs=None, *args, **kwargs):
         if pkgs is None:
@@ -79,14 +89,4 @@ class PipInstallPackage(Action):
         return "pip install %s" % pkgs
 
     def install_packages(self, cmd, packages):
-        installed = 0
-        for pkg in packages:
-            install_cmd = cmd_split(cmd.format(packages=pkg))
-            install_output = Popen(install_cmd)
-            while install_output.poll() is None:
-                sleep(0.5)
-            output = install_output.returncode
-            Log.debug("Running (pip) %s ... %r" % (install_cmd, output == 0))
-            if 0 == output:
-                installed += 1
-        return installed
+        return len(InstallPackage.run_transaction(cmd, packages, "pip"))
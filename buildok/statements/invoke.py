@@ -46,4 +46,6 @@ class InvokeTopic(Action):
     """
 
     def run(self, topic=None, *args, **kwargs):
-        pass
+        # Invoked topics are expanded into the plan of a topic, so this runs
+        # only when the step is run on its own
+        self.success("Running new topic => %s" % topic)
@@ -20,10 +20,12 @@
 
 from os import kill
 from signal import SIGTERM
-from subprocess import check_output, CalledProcessError
+from subprocess import CalledProcessError
 
 from buildok.action import Action
 
+from buildok.util.process import Process
+
 
 class KillProcess(Action):
     r"""Send SIGTERM signal to a process.
@@ -53,7 +55,7 @@ class KillProcess(Action):
     def run(self, pid=None, pname=None, *args, **kwargs):
         try:
             if pname is not None:
-                pid = check_output(["pidof", "-s", pname])
+                pid = Process.check_output(["pidof", "-s", pname])
             if pid is None:
                 raise ValueError("Invalid PID")
             kill(int(pid), SIGTERM)
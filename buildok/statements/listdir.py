@@ -20,16 +20,20 @@
 
 from __future__ import print_function
 
-from os import listdir, stat, getcwd, path as fpath
+from os import getcwd, path as fpath
 from stat import S_ISREG, S_ISFIFO, S_ISSOCK, S_ISLNK, \
                  S_ISDIR, S_ISCHR, S_ISBLK
 
 from buildok.action import Action
+from buildok.util.fs import scan_dir, sizeof_fmt
 
 
 class ListDir(Action):
     r"""List files in directory.
 
+    Rows are printed as entries are read, so huge directories start showing
+    right away. Each entry is inspected once and symlinks are not followed.
+
     Args:
         path (str): Path to directory.
 
@@ -50,42 +54,69 @@ class ListDir(Action):
         Listing directory => /tmp
     """
 
+    length = 80
+
     def run(self, path=None, *args, **kwargs):
         if path is None:
             path = getcwd()
-        length = 80
         try:
-            content = listdir(path)
             fullpath = fpath.abspath(path)
+            entries = scan_dir(fullpath)
             self.success("Listing directory => %s" % fullpath)
-            delimiter = "-" * (length)
-            print(u"\033[90m|%-{}s|\033[0m".format(length-4) % delimiter)
-            s_name = int((length-7) * .8)
-            s_size = int((length-7) - s_name)
-            row = u"\033[90m| %s |\033[0m"
-            row += u" %-{}s\033[90m|\033[0m %-{}s".format(s_name, s_size)
-            row += u"\033[90m|\033[0m"
-            print(row % (" ", "Name", "Size"))
-            print(u"\033[90m|%-{}s|\033[0m".format(length-4) % delimiter)
-            for f in content:
-                f_name = f if len(f) <= s_name else u"%s..." % f[:s_name-3]
-                f_type = self.get_file_type(fullpath, f)
+            self.print_header()
+            for f, _, meta in entries:
+                f_type = self.get_file_type(meta.st_mode)
                 if f_type == "f":
-                    f_size = self.get_file_size(fullpath, f)
+                    f_size = sizeof_fmt(meta.st_size)
                 else:
                     f_size = "--"
-                print(row % (f_type, f_name, f_size))
-            print(u"\033[90m|%-{}s|\033[0m".format(length-4) % delimiter)
+                self.print_row(f_type, f, f_size)
+            self.print_delimiter()
         except Exception as e:
             self.fail(str(e))
 
-    def get_file_size(self, root, filename):
-        filepath = fpath.join(root, filename)
-        return ListDir.sizeof_fmt(fpath.getsize(filepath))
+    def get_columns(self):
+        """Width of name and size columns.
+
+        Returns:
+            tuple: Name and size width.
+        """
+
+        s_name = int((self.length-7) * .8)
+        return s_name, (self.length-7) - s_name
+
+    def print_delimiter(self):
+        """Print horizontal line of table."""
+
+        delimiter = "-" * (self.length)
+        print(u"\033[90m|%-{}s|\033[0m".format(self.length-4) % delimiter)
+
+    def print_header(self):
+        """Print table header."""
 
-    def get_file_type(self, root, filename):
-        filepath = fpath.join(root, filename)
-        filemode = stat(filepath).st_mode
+        self.print_delimiter()
+        self.print_row(" ", "Name", "Size")
+        self.print_delimiter()
+
+    def print_row(self, f_type, f_name, f_size):
+        """Print table row.
+
+        Args:
+            f_type (str): Type of entry.
+            f_name (str): Name of entry, truncated if too long.
+            f_size (str): Size of entry.
+        """
+
+        s_name, s_size = self.get_columns()
+        if len(f_name) > s_name:
+            f_name = u"%s..." % f_name[:s_name-3]
+        row = u"\033[90m| %s |\033[0m"
+        row += u" %-{}s\033[90m|\033[0m %-{}s".format(s_name, s_size)
+        row += u"\033[90m|\033[0m"
+        print(row % (f_type, f_name, f_size))
+
+    @staticmethod
+    def get_file_type(filemode):
         if S_ISREG(filemode):
             return "f"
         elif S_ISSOCK(filemode):
@@ -107,12 +138,3 @@ class ListDir(Action):
         if path is None:
             path = "."
         return "ls -hal %s" % path
-
-    @staticmethod
-    def sizeof_fmt(num):
-        # https://web.archive.org/web/20111010015624/http://blogmag.net/blog/read/38/Print_human_readable_file_size
-        for x in ["bytes", "KB", "MB", "GB", "TB"]:
-            if num < 1024.0:
-                return "%3.1f%s" % (num, x)
-            num /= 1024.0
-        return num
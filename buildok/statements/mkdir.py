@@ -55,6 +55,10 @@ class MakeDir(Action):
         except OSError as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, path=None, *args, **kwargs):
+        return [path]
+
     @classmethod
     def convert_shell(cls, path=None, *args, **kwargs):
         if path is not None:
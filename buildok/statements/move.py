@@ -57,6 +57,10 @@ class Move(Action):
         except OSError as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, src=None, dst=None, *args, **kwargs):
+        return [src, dst]
+
     @classmethod
     def convert_shell(cls, src=None, dst=None, *args, **kwargs):
         if src is None and dst is None:
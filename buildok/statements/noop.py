@@ -41,3 +41,7 @@ class Noop(Action):
 
     def run(self, *args, **kwargs):
         self.success("Noop")
+
+    @classmethod
+    def resources(cls, *args, **kwargs):
+        return []
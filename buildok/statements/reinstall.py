@@ -64,6 +64,11 @@ class ReinstallPackage(InstallPackage):
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def batch(cls, batch):
+        # --batch-install merges install steps only
+        return None
+
     @classmethod
     def convert_shell(cls, pkgs=None, *args, **kwargs):
         if pkgs is None:
@@ -18,17 +18,22 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from os import path, remove
-from shutil import rmtree
+from os import path
 
 from buildok.action import Action
+from buildok.util.fs import TreeRemove, sizeof_fmt
 
 
 class Remove(Action):
     r"""Remove files from a given source.
 
+    Reports how many files were removed and how much space was freed. When
+    asked to remove in background, the source is renamed and removed by a
+    detached process, so the step returns immediately.
+
     Args:
-        src (str): Source of files.
+        src   (str): Source of files.
+        later (str): Remove in background if set.
 
     Retuns:
         str: Human readable descriptor message or error.
@@ -40,6 +45,8 @@ class Remove(Action):
         ^remove from `(?P<src>.+)`$
         ^remove `(?P<src>.+)` files$
         ^remove (?:file|folder|directory) `(?P<src>.+)`$
+        ^remove `(?P<src>.+)` files (?P<later>in background)$
+        ^remove (?:folder|directory) `(?P<src>.+)` (?P<later>in background)$
 
     Sample input:
         - Go to `/tmp`.
@@ -47,19 +54,28 @@ class Remove(Action):
         - Remove file `buildok_test_tmp.txt`.
 
     Expected:
-        Removed => buildok_test_tmp.txt
+        Removed => buildok_test_tmp.txt (1 file(s), 0.0bytes freed)
     """
 
-    def run(self, src=None, *args, **kwargs):
+    def run(self, src=None, later=None, *args, **kwargs):
+        tree = TreeRemove()
         try:
-            if path.isfile(src):
-                remove(src)
-            elif path.isdir(src):
-                rmtree(src)
-            self.success("Removed => %s" % src)
+            if later is not None and path.lexists(src):
+                TreeRemove.remove_later(src)
+                return self.success("Removing in background => %s" % src)
+            if path.isdir(src) and not path.islink(src):
+                tree.remove_tree(src)
+            elif path.lexists(src):
+                tree.remove_file(src)
+            self.success("Removed => %s (%d file(s), %s freed)" % (
+                src, tree.files, sizeof_fmt(tree.size)))
         except OSError as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, src=None, *args, **kwargs):
+        return [src]
+
     @classmethod
     def convert_shell(cls, src=None, *args, **kwargs):
         flags = kwargs.get("flags", "")
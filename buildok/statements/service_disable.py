@@ -19,12 +19,13 @@
 # THE SOFTWARE.
 
 from shlex import split as cmd_split
-from subprocess import Popen, CalledProcessError
-from time import sleep
+from subprocess import CalledProcessError
 
 from buildok.statements.service_enable import EnableService
 
+from buildok.util.capture import Capture
 from buildok.util.log import Log
+from buildok.util.process import Process
 
 
 class DisableService(EnableService):
@@ -68,9 +69,9 @@ class DisableService(EnableService):
             service_cmd = toggle_cmd.format(service=srv)
             log_status = (self.env.os_name, service_cmd)
             Log.debug("Service OS (%s) boot: %s ..." % log_status)
-            service_output = Popen(cmd_split(service_cmd))
-            while service_output.poll() is None:
-                sleep(0.5)
+            service_output = Process.run(cmd_split(service_cmd),
+                                         on_line=Process.show_line,
+                                         capture=Capture("service"))
             if 0 != service_output.returncode:
                 return self.fail(u"Service '%s' => failed to disable" % srv)
             self.success(u"Service '%s' => disabled" % srv)
@@ -19,11 +19,12 @@
 # THE SOFTWARE.
 
 from shlex import split as cmd_split
-from subprocess import Popen, CalledProcessError, PIPE
+from subprocess import CalledProcessError
 
 from buildok.action import Action
 
 from buildok.util.log import Log
+from buildok.util.process import Process
 
 
 class StatusService(Action):
@@ -79,8 +80,7 @@ class StatusService(Action):
 
     @classmethod
     def get_service_status(cls, service_cmd):
-        proc = Popen(cmd_split(service_cmd), stdout=PIPE)
-        stdout, _ = proc.communicate()
+        stdout = Process.run(cmd_split(service_cmd)).output
         for line in stdout.split("\n"):
             # https://www.freedesktop.org/software/systemd/man/systemctl.html
             if not line.lower().strip().startswith("active: "):
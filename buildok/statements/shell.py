@@ -18,15 +18,23 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from pipes import quote
 from shlex import split as cmd_split
-from subprocess import check_output, CalledProcessError, STDOUT
+from subprocess import CalledProcessError
 
 from buildok.action import Action
 
+from buildok.util.capture import Capture
+from buildok.util.process import Process
+from buildok.util.session import ShellSession
+
 
 class ShellExec(Action):
     r"""Run a command in shell.
 
+    Output is shown line by line while the command runs, so the summary
+    repeats it only if it fits on one line.
+
     Args:
         cmd (str): Raw shell command.
 
@@ -48,21 +56,64 @@ class ShellExec(Action):
 
     def run(self, cmd=None, *args, **kwargs):
         safe_cmd = cmd_split(cmd)
-        output_args = {"stderr": STDOUT}
+        if ShellSession.enabled:
+            return self.run_session(cmd, safe_cmd)
+        output_args = {}
         if self.env.shell_args is not None:
             if self.env.shell_args.unsafe_shell:
                 output_args.update({"shell": True})
             else:
                 cmd = safe_cmd
+        capture = Capture("shell")
         try:
-            output = check_output(cmd, **output_args)
+            output = Process.check_output(cmd, on_line=Process.show_line,
+                                          capture=capture, **output_args)
             if output is None:
                 output = "n/a"
-            self.success(u"Output => %s" % output.decode('utf-8').strip())
+            self.success(self.summarize(output, capture))
         except CalledProcessError as e:
             self.fail(e.output)
         except Exception as e:
             self.fail(str(e))
+        self.set_output_path(capture.get_filepath())
+
+    def run_session(self, cmd, safe_cmd):
+        # Without --unsafe-shell each argument is quoted, so the session runs
+        # the command as is, without expanding globs, pipes or variables
+        if self.env.shell_args is None or not self.env.shell_args.unsafe_shell:
+            cmd = " ".join(quote(arg) for arg in safe_cmd)
+        capture = Capture("shell")
+        try:
+            result = ShellSession.execute(cmd, on_line=Process.show_line,
+                                          capture=capture)
+            output = self.decode(result.output)
+            if result.timed_out:
+                self.fail(u"Timed out => %s" % output)
+            elif result.returncode != 0:
+                self.fail(output)
+            else:
+                self.success(self.summarize(result.output, capture))
+        except Exception as e:
+            self.fail(str(e))
+        self.set_output_path(capture.get_filepath())
+
+    def summarize(self, output, capture):
+        # Longer output was already streamed line by line, so it is counted
+        # instead of shown again
+        if capture.total > 1:
+            return u"Output => %d lines" % capture.total
+        return u"Output => %s" % self.decode(output)
+
+    def decode(self, output):
+        # Only the tail of output is kept, which may start in the middle of
+        # a multibyte character
+        return output.decode('utf-8', 'replace').strip()
+
+    @classmethod
+    def is_cacheable(cls):
+        # A shell session carries state between commands (e.g. `cd`), which
+        # is lost if a command is skipped
+        return not ShellSession.enabled
 
     @classmethod
     def convert_shell(cls, cmd=None, *args, **kwargs):
@@ -37,10 +37,11 @@ class Touch(Action):
         ^create(?: new)? file `(?P<filepath>[\w\.]+)`$
 
     Sample input:
-        - Create file `/tmp/buildok.txt`.
+        - Go to `/tmp`;
+        - Create file `buildok.txt`.
 
     Expected:
-        Created file => /tmp/buildok.txt
+        Created file => buildok.txt
     """
 
     def run(self, filepath=None, *args, **kwargs):
@@ -51,6 +52,10 @@ class Touch(Action):
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def resources(cls, filepath=None, *args, **kwargs):
+        return [filepath]
+
     @classmethod
     def convert_shell(cls, filepath=None, *args, **kwargs):
         if filepath is None:
@@ -43,6 +43,8 @@ class UninstallPackage(InstallPackage):
         Uninstalled 2 packages
     """
 
+    marks_installed = False
+
     os_packs = {
         ("alpine",):            "apk del {packages}",
         ("debian", "ubuntu"):   "apt-get purge {packages}",
@@ -56,14 +58,27 @@ class UninstallPackage(InstallPackage):
             cmd = UninstallPackage.check_install()
             if cmd is None:
                 return self.fail("Unsupported OS: %s" % self.env.os_name)
-            uninstalled_pkgs = self.install_packages(cmd, packages)
-            if uninstalled_pkgs > 0:
+            present = self.skip_packages(packages, installed=False)
+            skipped = len(packages) - len(present)
+            if len(present) == 0:
+                message = "Already uninstalled %d packages" % skipped
+                return self.success(message)
+            uninstalled_pkgs = self.install_packages(cmd, present)
+            if uninstalled_pkgs > 0 and skipped > 0:
+                status = (uninstalled_pkgs, skipped)
+                self.success("Uninstalled %d packages (%d skipped)" % status)
+            elif uninstalled_pkgs > 0:
                 self.success("Uninstalled %d packages" % uninstalled_pkgs)
             else:
                 self.fail("Failed to uninstall packages...")
         except Exception as e:
             self.fail(str(e))
 
+    @classmethod
+    def batch(cls, batch):
+        # --batch-install merges install steps only
+        return None
+
     @classmethod
     def convert_shell(cls, pkgs=None, *args, **kwargs):
         if pkgs is None:
@@ -64,6 +64,10 @@ class ViewWeb(Action):
             return "Cannot open \"%s\": %s" % (url, str(e))
         return None
 
+    @classmethod
+    def resources(cls, url=None, *args, **kwargs):
+        return []
+
     @classmethod
     def convert_shell(cls, url=None, *args, **kwargs):
         if url is None:
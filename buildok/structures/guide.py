@@ -26,15 +26,29 @@ class Guide(object):
         __guides (list): Private list of guides.
 
     Args:
-        topics (tuple): Imutable list of topics.
+        topics     (tuple): Imutable list of topics.
+        index       (dict): Topics mapped by lowercase title.
+        unresolved  (list): Placeholders in steps without a value.
     """
 
     __guides = []
 
     def __init__(self, topics=None):
         self.topics = topics
+        self.index = {}
+        self.unresolved = []
+        self.build_index()
         self.__guides.append(self)
 
+    def build_index(self):
+        """Rebuild title index from topics list.
+
+        First topic wins if more topics share the same title.
+        """
+        self.index = {}
+        for topic in self.topics or []:
+            self.index.setdefault(topic.get_title().lower(), topic)
+
     def add_topic(self, topic):
         """Appends topic to guide instance.
 
@@ -44,6 +58,7 @@ class Guide(object):
         if self.topics is None:
             self.topics = []
         self.topics.append(topic)
+        self.index.setdefault(topic.get_title().lower(), topic)
 
     def set_topics(self, value):
         """Guide setter for topics list.
@@ -57,6 +72,7 @@ class Guide(object):
         if not isinstance(value, list):
             raise TypeError("Unsupported topics list")
         self.topics = value
+        self.build_index()
 
     def get_topics(self):
         """Guide getter for topics list.
@@ -66,16 +82,29 @@ class Guide(object):
         """
         return self.topics
 
+    def set_unresolved(self, value):
+        """Guide setter for unresolved placeholders.
+
+        Args:
+            value (list): Names of placeholders without a value.
+        """
+        self.unresolved = value
+
+    def get_unresolved(self):
+        """Guide getter for unresolved placeholders.
+
+        Returns:
+            list: Names of placeholders without a value.
+        """
+        return getattr(self, "unresolved", [])
+
     def get_topic_by_title(self, title):
         """Lookup topic by title and return instance.
 
         Returns:
             mixt: Instance of topic or None.
         """
-        for t in self.topics:
-            if t.get_title().lower() == title.lower():
-                return t
-        return None
+        return self.index.get(title.lower())
 
     @classmethod
     def get_all_guides(cls):
@@ -86,5 +115,21 @@ class Guide(object):
         """
         return cls.__topics
 
+    @classmethod
+    def forget_all_guides(cls):
+        """Drop all stored guide instances.
+        """
+        del cls.__guides[:]
+
+    def __setstate__(self, state):
+        """Restore guide from cache.
+
+        Args:
+            state (dict): Pickled instance attributes.
+        """
+        self.__dict__.update(state)
+        self.build_index()
+        self.__guides.append(self)
+
     def __repr__(self):
         return unicode(self.__dict__)
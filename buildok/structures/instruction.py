@@ -20,6 +20,8 @@
 
 from re import compile, IGNORECASE, UNICODE
 
+from buildok.util.trace import Trace
+
 
 class Instruction(object):
     """Blueprint of an instruction.
@@ -38,6 +40,7 @@ class Instruction(object):
         kwargs     (dict): Action keyword arguments after applying expression.
         status     (bool): Instruction status after action handler run.
         output      (str): Instruction output after action handler run.
+        output_path (str): Path to full output, if action saved it to file.
 
     Raises:
         TypeError: If invalid datatype is provided.
@@ -73,6 +76,7 @@ class Instruction(object):
         self.description = None
         self.status = None
         self.output = None
+        self.output_path = None
 
     def get_status(self):
         """Instruction status getter.
@@ -86,11 +90,25 @@ class Instruction(object):
     def get_output(self):
         """Instruction output getter.
 
+        Output of long running commands is only a tail, followed by the path
+        to the full output.
+
         Returns:
             str: Instruction run output.
         """
 
-        return self.output
+        if self.output_path is None:
+            return self.output
+        return u"%s\nFull output => %s" % (self.output, self.output_path)
+
+    def get_output_path(self):
+        """Instruction full output path getter.
+
+        Returns:
+            str: Path to full output or None.
+        """
+
+        return self.output_path
 
     def set_payload(self, payload):
         """Instruction payload setter.
@@ -294,18 +312,26 @@ class Instruction(object):
         if not callable(self.action):
             raise TypeError("Action is not set")
         handler = self.action()
+        name = handler.__class__.__name__
+        started = Trace.start()
         handler.before_run()
+        Trace.finish(started, "%s.before_run" % name, "action")
         handler.set_payload(self.payload)
         if not isinstance(self.kwargs, dict):
             self.kwargs = {}
         if not isinstance(self.args, tuple):
             self.args = ()
+        started = Trace.start()
         if len(self.kwargs) >= len(self.args):
             handler.run(**self.kwargs)
         else:
             handler.run(*self.args)
+        Trace.finish(started, "%s.run" % name, "action")
+        started = Trace.start()
         handler.after_run()
+        Trace.finish(started, "%s.after_run" % name, "action")
         self.status, self.output = handler.get_status()
+        self.output_path = handler.get_output_path()
         return self.status, self.output
 
     def __repr__(self):
@@ -35,6 +35,8 @@ class Topic(object):
         order   (int): Order of appearance in build steps.
         title   (str): Topic name as found by pattern matching.
         steps  (list): List of instructions.
+        plan   (list): Steps with invoked topics expanded.
+        index   (set): Lowercase text of all steps.
     """
 
     TOPIC = r""
@@ -48,8 +50,17 @@ class Topic(object):
         self.order = order
         self.title = title
         self.steps = steps
+        self.plan = None
+        self.index = set()
+        self.build_index()
         self.__topics.append(self)
 
+    def build_index(self):
+        """Rebuild lowercase index of steps.
+        """
+
+        self.index = set([s.get_step().lower() for s in self.steps or []])
+
     def set_position(self, value):
         """Topic position setter.
 
@@ -106,10 +117,7 @@ class Topic(object):
             bool: True if step exists, otherwise False.
         """
 
-        for s in self.steps:
-            if s.get_step().lower() == step.lower():
-                return True
-        return False
+        return step.lower() in self.index
 
     def add_step(self, step):
         """Appends step to topic instance.
@@ -121,6 +129,7 @@ class Topic(object):
         if self.steps is None:
             self.steps = []
         self.steps.append(step)
+        self.index.add(step.get_step().lower())
 
     def set_steps(self, value):
         """Topic setter for instructions list.
@@ -135,6 +144,7 @@ class Topic(object):
         if not isinstance(value, list):
             raise TypeError("Unsupported instructions list")
         self.steps = value
+        self.build_index()
 
     def get_steps(self):
         """Topic getter for instructions list.
@@ -145,6 +155,24 @@ class Topic(object):
 
         return self.steps
 
+    def set_plan(self, value):
+        """Topic setter for execution plan.
+
+        Args:
+            value (mixt): List of instructions or None if unresolved.
+        """
+
+        self.plan = value
+
+    def get_plan(self):
+        """Topic getter for execution plan.
+
+        Returns:
+            mixt: List of instructions with invoked topics expanded.
+        """
+
+        return self.plan
+
     @classmethod
     def get_all_topics(cls):
         """Return stored topic instances.
@@ -155,6 +183,13 @@ class Topic(object):
 
         return cls.__topics
 
+    @classmethod
+    def forget_all_topics(cls):
+        """Drop all stored topic instances.
+        """
+
+        del cls.__topics[:]
+
     @classmethod
     def set_project_topic_pattern(cls, topic_pattern):
         """Change project topic pattern.
@@ -212,5 +247,19 @@ class Topic(object):
         cls.PATTERN = re.compile(cls.TOPIC_PATTERN, re.I)
         return cls
 
+    def __setstate__(self, state):
+        """Restore topic from cache.
+
+        Unpickled topics are stored like parsed ones and get their lowercase
+        step index rebuilt from the restored steps.
+
+        Args:
+            state (dict): Pickled instance attributes.
+        """
+
+        self.__dict__.update(state)
+        self.build_index()
+        self.__topics.append(self)
+
     def __repr__(self):
         return unicode(self.__dict__)
@@ -49,11 +49,10 @@ def scan_statements(statement):
     lines = {}
     if statement is None:
         return lines
-    for action in statement.get_actions():
-        for line in action.parse_statements():
-            if lines.get(line) is None:
-                lines.update({line: 0})
-            lines[line] += 1
+    for line in statement.get_patterns():
+        if lines.get(line) is None:
+            lines.update({line: 0})
+        lines[line] += 1
     return lines
 
 
@@ -99,7 +98,7 @@ def analyze(statement, length=80):
         print(u"\033[90m|   |\033[0m" + fmt(c_txt, text) + "\033[90m|\033[0m")
         print(u"\033[90m|---|%-{}s|\033[0m".format(length-4) % delimiter)
         for line in action.parse_statements():
-            if lines[line] > 1:
+            if lines[line.strip()] > 1:
                 status = UnicodeIcon.INVALID
                 line_text = fmt(r_txt, line.strip())
             else:
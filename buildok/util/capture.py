@@ -0,0 +1,125 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from collections import deque
+from itertools import count
+from os import getpid
+from time import strftime
+
+from buildok.util.log import Log
+from buildok.util.state import state_path
+
+
+class Capture(object):
+    """Bounded capture of command output.
+
+    Keeps only the last lines of output in memory. Once output outgrows the
+    tail, everything (including lines already seen) is spilled to a log file
+    of the current run, under `.buildok/runs/<run>/`.
+
+    Attributes:
+        tail      (int): Default number of lines kept in memory.
+        run_id    (str): Name of current run directory.
+        counter (count): Sequence of log files in current run.
+
+    Args:
+        name (str): Log file name prefix.
+        tail (int): Number of lines kept in memory.
+    """
+
+    tail = 200
+    run_id = "%s-%d" % (strftime("%Y%m%d-%H%M%S"), getpid())
+    counter = count(1)
+
+    def __init__(self, name="step", tail=None):
+        self.name = name
+        self.lines = deque(maxlen=tail or self.tail)
+        self.total = 0
+        self.filepath = None
+        self.file = None
+        self.spillable = True
+
+    @classmethod
+    def set_tail(cls, tail):
+        """Default tail setter.
+
+        Args:
+            tail (int): Number of lines kept in memory.
+        """
+
+        cls.tail = tail
+
+    def write(self, line):
+        """Capture a line of output.
+
+        Args:
+            line (str): Output line.
+        """
+
+        if self.file is None and self.spillable and \
+                len(self.lines) == self.lines.maxlen:
+            self.spill()
+        if self.file is not None:
+            self.file.write(line)
+        self.lines.append(line)
+        self.total += 1
+
+    def spill(self):
+        """Open run log file and write all output captured so far.
+
+        If the log file cannot be written, only the tail is kept.
+        """
+
+        filename = "%s-%04d.log" % (self.name, next(self.counter))
+        try:
+            filepath = state_path("runs", self.run_id, filename)
+            self.file = open(filepath, "wb")
+            self.file.writelines(self.lines)
+            self.filepath = filepath
+        except (IOError, OSError) as e:
+            Log.debug("Cannot save full output: %s" % e)
+            self.spillable = False
+            self.close()
+
+    def close(self):
+        """Close run log file, if any.
+        """
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def get_tail(self):
+        """Last lines of output.
+
+        Returns:
+            str: Output tail.
+        """
+
+        return b"".join(self.lines)
+
+    def get_filepath(self):
+        """Path to full output.
+
+        Returns:
+            mixt: Log file path or None if output was not spilled.
+        """
+
+        return self.filepath
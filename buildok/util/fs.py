@@ -0,0 +1,512 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import os
+
+from errno import EINVAL, ENOSYS
+from multiprocessing.pool import ThreadPool
+from shutil import copyfileobj, copymode
+from stat import S_ISDIR
+from subprocess import Popen
+from time import time
+
+try:
+    from os import scandir, walk
+except ImportError:
+    try:
+        from scandir import scandir, walk
+    except ImportError:
+        scandir, walk = None, os.walk
+
+try:
+    from os import sendfile
+except ImportError:
+    try:
+        from sendfile import sendfile
+    except ImportError:
+        sendfile = None
+
+
+def scan_dir(folder):
+    """Iterate entries of a folder with their status.
+
+    Entries are produced lazily, with a single lstat per entry. Errors on
+    opening the folder are raised right away, not on first iteration.
+
+    Args:
+        folder (str): Path to folder.
+
+    Returns:
+        iterator: Name, path and status of each entry.
+    """
+
+    if scandir is not None:
+        return ((e.name, e.path, e.stat(follow_symlinks=False))
+                for e in scandir(folder))
+    return ((n, p, os.lstat(p)) for n, p in
+            ((n, os.path.join(folder, n)) for n in os.listdir(folder)))
+
+
+def tree_size(folder):
+    """Sum sizes of everything under a folder.
+
+    Symlinks are counted as links and never followed. Folders that cannot
+    be read are skipped.
+
+    Args:
+        folder (str): Path to folder.
+
+    Returns:
+        int: Bytes used by files under folder.
+    """
+
+    size, pending = 0, [folder]
+    while len(pending) > 0:
+        try:
+            for _, entry, meta in scan_dir(pending.pop()):
+                if S_ISDIR(meta.st_mode):
+                    pending.append(entry)
+                else:
+                    size += meta.st_size
+        except OSError:
+            continue
+    return size
+
+
+def sizeof_fmt(num):
+    """Format a number of bytes for humans.
+
+    Args:
+        num (int): Number of bytes.
+
+    Returns:
+        str: Size with unit.
+    """
+
+    for x in ["bytes", "KB", "MB", "GB", "TB"]:
+        if num < 1024.0:
+            return "%3.1f%s" % (num, x)
+        num /= 1024.0
+    return "%3.1fPB" % num
+
+
+class TreeCopy(object):
+    """Copy files and folders, skipping files already up to date.
+
+    A destination file is up to date if it has the same size and
+    modification time as its source. Copied files keep mode and modification
+    time of their source, so copying the same tree again skips them all.
+    Data is moved by the kernel with sendfile when available. Files of large
+    trees are copied on a pool of threads.
+
+    Attributes:
+        workers   (int): Number of threads copying files of a tree.
+        threshold (int): Minimum number of files in a tree to use threads.
+        buffer    (int): Buffer size when copying in userspace.
+
+    Args:
+        copied  (int): Number of files copied.
+        skipped (int): Number of files up to date.
+        size    (int): Bytes copied.
+    """
+
+    workers = 8
+    threshold = 32
+    buffer = 1 << 20
+
+    def __init__(self):
+        self.copied = 0
+        self.skipped = 0
+        self.size = 0
+
+    def copy_file(self, src, dst):
+        """Copy a file to a file or into a folder.
+
+        Args:
+            src (str): Source file.
+            dst (str): Destination file or folder.
+        """
+
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        self.count([self.sync_file((src, dst))])
+
+    def copy_tree(self, src, dst):
+        """Copy content of a folder into another, creating it if missing.
+
+        Symlinks are followed, as copying their targets.
+
+        Args:
+            src (str): Source folder.
+            dst (str): Destination folder.
+
+        Raises:
+            OSError: If `src` is not a folder.
+        """
+
+        if not os.path.isdir(src):
+            raise OSError("Cannot copy tree: not a directory: %s" % src)
+        jobs = []
+        for root, _, files in walk(src, followlinks=True):
+            target = os.path.normpath(
+                os.path.join(dst, os.path.relpath(root, src)))
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            for name in files:
+                jobs.append((os.path.join(root, name),
+                             os.path.join(target, name)))
+        if len(jobs) < self.threshold:
+            return self.count(map(self.sync_file, jobs))
+        pool = ThreadPool(self.workers)
+        try:
+            self.count(pool.map(self.sync_file, jobs, chunksize=8))
+        finally:
+            pool.close()
+            pool.join()
+
+    def count(self, results):
+        """Update counters from results of sync_file.
+
+        Args:
+            results (list): Bytes copied or None for each file.
+        """
+
+        for size in results:
+            if size is None:
+                self.skipped += 1
+            else:
+                self.copied += 1
+                self.size += size
+
+    def sync_file(self, job):
+        """Copy a file unless destination is up to date.
+
+        Args:
+            job (tuple): Source and destination file.
+
+        Returns:
+            mixt: Bytes copied or None if file is up to date.
+        """
+
+        src, dst = job
+        meta = os.stat(src)
+        if self.is_up_to_date(meta, dst):
+            return None
+        with open(src, "rb") as fsrc:
+            with open(dst, "wb") as fdst:
+                self.transfer(fsrc, fdst, meta.st_size)
+        copymode(src, dst)
+        os.utime(dst, (meta.st_atime, meta.st_mtime))
+        return meta.st_size
+
+    @staticmethod
+    def is_up_to_date(meta, dst):
+        """Check if destination matches source size and modification time.
+
+        Args:
+            meta (stat): Status of source file.
+            dst   (str): Destination file.
+
+        Returns:
+            bool: True if destination doesn't need to be copied.
+        """
+
+        try:
+            other = os.stat(dst)
+        except OSError:
+            return False
+        return other.st_size == meta.st_size and \
+            int(other.st_mtime) == int(meta.st_mtime)
+
+    def transfer(self, fsrc, fdst, size):
+        """Copy data between open files.
+
+        Uses sendfile if available and supported by both files, otherwise
+        copies in userspace.
+
+        Args:
+            fsrc (file): Source file.
+            fdst (file): Destination file.
+            size  (int): Source file size.
+        """
+
+        offset = 0
+        if sendfile is not None:
+            try:
+                while offset < size:
+                    sent = sendfile(fdst.fileno(), fsrc.fileno(), offset,
+                                    min(size - offset, 1 << 30))
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset >= size:
+                    return
+            except OSError as e:
+                if e.errno not in (EINVAL, ENOSYS) or offset > 0:
+                    raise
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        copyfileobj(fsrc, fdst, self.buffer)
+
+
+class TreeRemove(object):
+    """Remove files and folders, counting what is freed.
+
+    Files are removed in batches while their folder is scanned, on a pool
+    of threads once a batch is large enough. Folders are removed bottom-up.
+    The status from scanning gives both the type and the size of an entry,
+    so each file costs one lstat and one unlink. Symlinks are removed, never
+    followed.
+
+    Attributes:
+        workers   (int): Number of threads removing files of a tree.
+        threshold (int): Minimum number of files in a batch to use threads.
+        batch     (int): Maximum number of files in a batch.
+        trash     (str): Name format of folders pending removal.
+
+    Args:
+        files   (int): Number of files removed.
+        folders (int): Number of folders removed.
+        size    (int): Bytes freed.
+        pool (ThreadPool): Threads removing files, if started.
+    """
+
+    workers = 8
+    threshold = 32
+    batch = 1024
+    trash = r".%s.%d-%d.trash"
+
+    def __init__(self):
+        self.files = 0
+        self.folders = 0
+        self.size = 0
+        self.pool = None
+
+    def remove_file(self, filepath):
+        """Remove a file or a symlink.
+
+        Args:
+            filepath (str): Path to file.
+        """
+
+        self.count([self.unlink((filepath, os.lstat(filepath).st_size))])
+
+    def remove_tree(self, folder):
+        """Remove a folder and everything in it.
+
+        Args:
+            folder (str): Path to folder.
+
+        Raises:
+            OSError: If anything cannot be removed.
+        """
+
+        folders, pending = [], [folder]
+        try:
+            while len(pending) > 0:
+                current = pending.pop()
+                folders.append(current)
+                files = []
+                for _, entry, meta in scan_dir(current):
+                    if S_ISDIR(meta.st_mode):
+                        pending.append(entry)
+                        continue
+                    files.append((entry, meta.st_size))
+                    if len(files) == self.batch:
+                        self.remove_batch(files)
+                        files = []
+                self.remove_batch(files)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+        for current in reversed(folders):
+            os.rmdir(current)
+            self.folders += 1
+
+    def remove_batch(self, files):
+        """Remove a batch of files, on threads if the batch is large.
+
+        The pool of threads is started on the first large batch.
+
+        Args:
+            files (list): Path and size of files.
+        """
+
+        if len(files) < self.threshold:
+            return self.count(map(self.unlink, files))
+        if self.pool is None:
+            self.pool = ThreadPool(self.workers)
+        self.count(self.pool.map(self.unlink, files, chunksize=64))
+
+    def count(self, results):
+        """Update counters from results of unlink.
+
+        Args:
+            results (list): Bytes freed for each file.
+        """
+
+        for size in results:
+            self.files += 1
+            self.size += size
+
+    @staticmethod
+    def unlink(job):
+        """Remove a file and return its size.
+
+        Args:
+            job (tuple): Path and size of file.
+
+        Returns:
+            int: Bytes freed.
+        """
+
+        filepath, size = job
+        os.unlink(filepath)
+        return size
+
+    @classmethod
+    def remove_later(cls, filepath):
+        """Move a file or folder out of the way and remove it in background.
+
+        The rename is atomic and happens on the same filesystem, so the path
+        is free as soon as this returns. Removal runs in a detached process
+        that outlives the build.
+
+        Args:
+            filepath (str): Path to file or folder.
+
+        Returns:
+            str: Temporary path being removed.
+        """
+
+        filepath = os.path.abspath(filepath).rstrip(os.sep)
+        folder, name = os.path.split(filepath)
+        trash = os.path.join(folder, cls.trash % (name, os.getpid(),
+                                                  int(time() * 1000)))
+        os.rename(filepath, trash)
+        with open(os.devnull, "r+") as devnull:
+            Popen(["rm", "-rf", trash], stdin=devnull, stdout=devnull,
+                  stderr=devnull, close_fds=True, preexec_fn=os.setsid)
+        return trash
+
+
+class TreeChange(object):
+    """Change a tree of files, skipping entries already changed.
+
+    Entries are checked with their lstat status, so only those that need it
+    are written. Symlinks are never followed. Subfolders of the top folder
+    are walked in parallel on a pool of threads.
+
+    Attributes:
+        workers (int): Number of threads walking subfolders.
+
+    Args:
+        outdated (callable): Called with status of entry, returns True if
+                             entry needs to be changed.
+        update   (callable): Called with path of entry to change it.
+        changed       (int): Number of entries changed.
+        untouched     (int): Number of entries already up to date.
+    """
+
+    workers = 8
+
+    def __init__(self, outdated, update):
+        self.outdated = outdated
+        self.update = update
+        self.changed = 0
+        self.untouched = 0
+
+    def apply(self, filepath):
+        """Change a file, or a folder recursively.
+
+        Args:
+            filepath (str): Path to file or folder.
+
+        Raises:
+            OSError: If an entry cannot be read or changed.
+        """
+
+        meta = os.lstat(filepath)
+        self.count([self.visit(filepath, meta)])
+        if not S_ISDIR(meta.st_mode):
+            return
+        subtrees = []
+        for _, entry, meta in scan_dir(filepath):
+            if S_ISDIR(meta.st_mode):
+                subtrees.append(entry)
+            else:
+                self.count([self.visit(entry, meta)])
+        if len(subtrees) < 2:
+            return self.count(map(self.walk, subtrees))
+        pool = ThreadPool(min(self.workers, len(subtrees)))
+        try:
+            self.count(pool.map(self.walk, subtrees))
+        finally:
+            pool.close()
+            pool.join()
+
+    def count(self, results):
+        """Update counters from results of visit or walk.
+
+        Args:
+            results (list): Changed and untouched entries.
+        """
+
+        for changed, untouched in results:
+            self.changed += changed
+            self.untouched += untouched
+
+    def visit(self, filepath, meta):
+        """Change an entry if outdated.
+
+        Args:
+            filepath (str): Path to entry.
+            meta    (stat): Status of entry.
+
+        Returns:
+            tuple: Changed and untouched entries.
+        """
+
+        if not self.outdated(meta):
+            return 0, 1
+        self.update(filepath)
+        return 1, 0
+
+    def walk(self, folder):
+        """Change a folder and everything under it.
+
+        Args:
+            folder (str): Path to folder.
+
+        Returns:
+            tuple: Changed and untouched entries.
+        """
+
+        changed, untouched = self.visit(folder, os.lstat(folder))
+        pending = [folder]
+        while len(pending) > 0:
+            for _, entry, meta in scan_dir(pending.pop()):
+                if S_ISDIR(meta.st_mode):
+                    pending.append(entry)
+                result = self.visit(entry, meta)
+                changed += result[0]
+                untouched += result[1]
+        return changed, untouched
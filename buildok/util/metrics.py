@@ -0,0 +1,106 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+from timeit import default_timer
+
+try:
+    from resource import getrusage, RUSAGE_CHILDREN
+except ImportError:
+    getrusage, RUSAGE_CHILDREN = None, None
+
+
+class Metrics(object):
+    """Resource usage of a step.
+
+    Measures wall time and the user and system CPU time of child processes
+    waited for while the step ran. Child usage is process-wide, so steps
+    running on parallel workers may share each other's usage.
+
+    Peak RSS of child processes is a high-water mark of the whole run; a
+    step gets it only if the step raised it, otherwise it's None. Values
+    are in kilobytes on Linux.
+
+    Attributes:
+        wall    (float): Wall time in seconds.
+        utime   (float): User CPU time of child processes in seconds.
+        stime   (float): System CPU time of child processes in seconds.
+        maxrss    (int): Peak RSS of child processes or None.
+        output    (int): Size of step output in bytes.
+    """
+
+    def __init__(self):
+        self.wall = 0.0
+        self.utime = 0.0
+        self.stime = 0.0
+        self.maxrss = None
+        self.output = 0
+        self.start_time = default_timer()
+        self.start_usage = self.get_usage()
+
+    @staticmethod
+    def get_usage():
+        """Resource usage of child processes.
+
+        Returns:
+            mixt: Usage struct or None if not supported by system.
+        """
+
+        if getrusage is None:
+            return None
+        return getrusage(RUSAGE_CHILDREN)
+
+    def stop(self):
+        """Compute usage since metrics were created.
+
+        Returns:
+            self: Self instance.
+        """
+
+        self.wall = default_timer() - self.start_time
+        usage = self.get_usage()
+        if usage is not None and self.start_usage is not None:
+            self.utime = usage.ru_utime - self.start_usage.ru_utime
+            self.stime = usage.ru_stime - self.start_usage.ru_stime
+            if usage.ru_maxrss > self.start_usage.ru_maxrss:
+                self.maxrss = usage.ru_maxrss
+        return self
+
+    def set_output(self, size):
+        """Output size setter.
+
+        Args:
+            size (int): Size of step output in bytes.
+        """
+
+        self.output = size
+
+    def to_dict(self):
+        """Export metrics.
+
+        Returns:
+            dict: Metrics as key-value.
+        """
+
+        return {
+            "wall": self.wall,
+            "utime": self.utime,
+            "stime": self.stime,
+            "maxrss": self.maxrss,
+            "output": self.output,
+        }
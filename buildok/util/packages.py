@@ -0,0 +1,162 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from os import path
+from re import compile
+
+from buildok.util.log import Log
+
+
+class PackageIndex(object):
+    """Index of installed system packages.
+
+    Reads the package database directly (dpkg status file or apk installed
+    database) once per run, so statements can tell what is installed without
+    asking the package manager. Statements update the index after each
+    transaction instead of reading the database again.
+
+    Attributes:
+        databases (dict): Package database and format by OS name.
+        packages   (set): Names of installed packages; None until loaded.
+        available (bool): False if no database could be read.
+        plain    (RegEx): Package names that can be looked up (no version,
+                          architecture or wildcard).
+    """
+
+    databases = {
+        ("alpine",):            ("/lib/apk/db/installed", "apk"),
+        ("debian", "ubuntu"):   ("/var/lib/dpkg/status", "dpkg"),
+    }
+
+    packages = None
+    available = False
+
+    plain = compile(r"^[a-z0-9][a-z0-9\+\-\.]*$")
+
+    @classmethod
+    def load(cls, os_name):
+        """Read package database of current OS once.
+
+        Args:
+            os_name (str): Operating System name.
+
+        Returns:
+            bool: True if index is available.
+        """
+
+        if cls.packages is not None:
+            return cls.available
+        cls.packages = set()
+        for oses, (filepath, fmt) in cls.databases.iteritems():
+            if os_name not in oses or not path.isfile(filepath):
+                continue
+            try:
+                parser = getattr(cls, "parse_%s" % fmt)
+                with open(filepath, "r") as fd:
+                    cls.packages = parser(fd.read())
+                cls.available = True
+                Log.debug("Indexed %d installed packages from %s" % (
+                    len(cls.packages), filepath))
+            except Exception as e:
+                Log.debug("Cannot index installed packages: %s" % e)
+        return cls.available
+
+    @classmethod
+    def parse_dpkg(cls, data):
+        """Parse dpkg status file.
+
+        Args:
+            data (str): Content of status file.
+
+        Returns:
+            set: Names of installed packages.
+        """
+
+        packages = set()
+        for block in data.split("\n\n"):
+            name, installed = None, False
+            for line in block.splitlines():
+                if line.startswith("Package:"):
+                    name = line[8:].strip()
+                elif line.startswith("Status:"):
+                    installed = line.split()[-1] == "installed"
+            if name is not None and installed:
+                packages.add(name)
+        return packages
+
+    @classmethod
+    def parse_apk(cls, data):
+        """Parse apk installed database.
+
+        Args:
+            data (str): Content of installed database.
+
+        Returns:
+            set: Names of installed packages.
+        """
+
+        return set(l[2:].strip() for l in data.splitlines()
+                   if l.startswith("P:"))
+
+    @classmethod
+    def is_installed(cls, os_name, name):
+        """Check whetever a package is installed.
+
+        Args:
+            os_name (str): Operating System name.
+            name    (str): Package name.
+
+        Returns:
+            mixt: True or False if known, None if it cannot be told.
+        """
+
+        if not cls.load(os_name) or cls.plain.match(name) is None:
+            return None
+        return name in cls.packages
+
+    @classmethod
+    def add(cls, names):
+        """Mark packages as installed.
+
+        Args:
+            names (list): Package names.
+        """
+
+        if cls.available:
+            cls.packages.update(names)
+
+    @classmethod
+    def remove(cls, names):
+        """Mark packages as not installed.
+
+        Args:
+            names (list): Package names.
+        """
+
+        if cls.available:
+            cls.packages.difference_update(names)
+
+    @classmethod
+    def reset(cls):
+        """Drop index, so it's read again when needed.
+        """
+
+        cls.packages = None
+        cls.available = False
@@ -0,0 +1,243 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from collections import namedtuple
+from os import killpg, setpgrp
+from signal import SIGKILL
+from subprocess import Popen, PIPE, STDOUT, CalledProcessError
+from threading import Event, Lock, Thread, Timer
+
+from buildok.util.log import Log
+from buildok.util.trace import Trace
+
+
+class Process(object):
+    """Subprocess runner shared by statements.
+
+    Output of the child is read line by line on a separate thread, while
+    the child exit is awaited directly (no polling), so a command costs
+    exactly as long as it runs. Once the child exits, remaining output is
+    read for a short time only: a daemon started in background may keep the
+    output open long after the command is done. A timeout kills the child if
+    it runs for too long. Commands with a timeout run in their own process
+    group, so anything they spawned is killed too.
+
+    Attributes:
+        timeout (float): Default timeout in seconds; None to wait forever.
+        drain   (float): Seconds to read output after the child exits.
+        chunk     (int): Longest piece of a line read at once.
+        Result  (tuple): Return code, output and timed out flag of a run.
+    """
+
+    timeout = None
+    drain = 0.5
+    chunk = 65536
+
+    Result = namedtuple("Result", ["returncode", "output", "timed_out"])
+
+    @classmethod
+    def set_timeout(cls, timeout):
+        """Default timeout setter.
+
+        Args:
+            timeout (float): Seconds to wait for a command; None to disable.
+        """
+
+        cls.timeout = timeout
+
+    @classmethod
+    def run(cls, cmd, shell=False, timeout=None, on_line=None, capture=None):
+        """Run a command and wait for it to exit.
+
+        Standard error is merged into standard output.
+
+        Args:
+            cmd        (mixt): List of arguments or string if `shell` is set.
+            shell      (bool): Run command through the shell.
+            timeout   (float): Seconds before the child is killed. Defaults to
+                               the class timeout.
+            on_line (callable): Called with each output line as it arrives.
+                               Defaults to debug log.
+            capture (Capture): Keeps output instead of memory, so the result
+                               holds only its tail.
+
+        Returns:
+            Result: Return code, output and timed out flag.
+        """
+
+        if timeout is None:
+            timeout = cls.timeout
+        if on_line is None:
+            on_line = cls.log_line
+        limited = timeout is not None and timeout > 0
+        started = Trace.start()
+        proc = Popen(cmd, stdout=PIPE, stderr=STDOUT, shell=shell,
+                     close_fds=True, preexec_fn=setpgrp if limited else None)
+        expired = []
+        timer = None
+        if limited:
+            timer = Timer(timeout, cls.expire, (proc, expired))
+            timer.daemon = True
+            timer.start()
+        lines = []
+        keep = lines.append if capture is None else capture.write
+        lock, done = Lock(), Event()
+        reader = Thread(target=cls.pump,
+                        args=(proc.stdout, keep, on_line, lock, done))
+        reader.daemon = True
+        reader.start()
+        try:
+            returncode = proc.wait()
+            reader.join(cls.drain)
+        except BaseException:
+            if limited:
+                cls.expire(proc, [])
+            raise
+        finally:
+            with lock:
+                done.set()
+            if timer is not None:
+                timer.cancel()
+                timer.join()
+        if reader.is_alive():
+            Log.debug("Output left open by background process: %s" % cmd)
+        if len(expired) > 0:
+            Log.debug("Command killed after %ss: %s" % (timeout, cmd))
+        if capture is not None:
+            capture.close()
+            lines = [capture.get_tail()]
+        Trace.finish(started, cls.describe(cmd), "process", pid=proc.pid,
+                     returncode=returncode, timed_out=len(expired) > 0)
+        return cls.Result(returncode, b"".join(lines), len(expired) > 0)
+
+    @staticmethod
+    def describe(cmd, limit=80):
+        """Short text of a command.
+
+        Args:
+            cmd (mixt): List of arguments or string.
+            limit (int): Maximum length of text.
+
+        Returns:
+            str: Command text.
+        """
+
+        if not isinstance(cmd, basestring):
+            cmd = " ".join(cmd)
+        if len(cmd) > limit:
+            return cmd[:limit - 3] + "..."
+        return cmd
+
+    @classmethod
+    def read_lines(cls, stream):
+        """Read output line by line as it arrives.
+
+        Very long lines are read in chunks, so a line without end never has
+        to fit in memory.
+
+        Args:
+            stream (file): Output stream.
+
+        Returns:
+            iterator: Output lines.
+        """
+
+        return iter(lambda: stream.readline(cls.chunk), b"")
+
+    @classmethod
+    def pump(cls, stream, keep, on_line, lock, done):
+        """Read output of a child until it ends or the run is done.
+
+        Args:
+            stream     (file): Output stream.
+            keep   (callable): Called with each line to keep it.
+            on_line (callable): Called with each line as it arrives.
+            lock       (Lock): Held while a line is handled.
+            done      (Event): Set when the run no longer wants output.
+        """
+
+        for line in cls.read_lines(stream):
+            with lock:
+                if done.is_set():
+                    break
+                keep(line)
+                on_line(line)
+        stream.close()
+
+    @classmethod
+    def check_output(cls, cmd, shell=False, timeout=None, on_line=None,
+                     capture=None):
+        """Run a command and return its output.
+
+        Same as `run`, but behaves like `subprocess.check_output`.
+
+        Raises:
+            CalledProcessError: If command exits with non-zero status or
+                                times out.
+
+        Returns:
+            str: Command output.
+        """
+
+        result = cls.run(cmd, shell, timeout, on_line, capture)
+        if result.timed_out:
+            output = "Timed out after %ss\n%s" % (
+                timeout or cls.timeout, result.output)
+            raise CalledProcessError(result.returncode, cmd, output)
+        if result.returncode != 0:
+            raise CalledProcessError(result.returncode, cmd, result.output)
+        return result.output
+
+    @classmethod
+    def expire(cls, proc, expired):
+        """Kill the process group of a running child.
+
+        Args:
+            proc    (Popen): Child process.
+            expired  (list): Marked if the child was still running.
+        """
+
+        if proc.poll() is not None:
+            return
+        try:
+            killpg(proc.pid, SIGKILL)
+            expired.append(True)
+        except OSError:
+            pass
+
+    @classmethod
+    def log_line(cls, line):
+        """Default output callback.
+
+        Args:
+            line (str): Output line.
+        """
+
+        Log.debug(u"| %s" % line.decode("utf-8", "replace").rstrip())
+
+    @classmethod
+    def show_line(cls, line):
+        """Output callback for commands whose output the user follows.
+
+        Args:
+            line (str): Output line.
+        """
+
+        Log.info(u"| %s" % line.decode("utf-8", "replace").rstrip())
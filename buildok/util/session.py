@@ -0,0 +1,190 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from os import chdir, getcwd, killpg, setpgrp
+from pipes import quote
+from signal import SIGKILL
+from subprocess import Popen, PIPE, STDOUT
+from threading import Timer
+from uuid import uuid4
+
+from buildok.util.log import Log
+from buildok.util.process import Process
+from buildok.util.trace import Trace
+
+
+class ShellSession(object):
+    """Persistent shell coprocess.
+
+    Keeps one shell running across steps, so exported variables, aliases and
+    the working directory carry over from one command to the next, and no
+    process is spawned per command. Each command is passed to `eval` as a
+    single quoted word, followed by a line with a random marker, its exit
+    code and the working directory of the shell. Output is read until the
+    marker shows up.
+
+    The working directory is kept in sync both ways: a `cd` inside a command
+    moves buildok as well, and changing directory with a statement moves the
+    shell before its next command.
+
+    Attributes:
+        enabled  (bool): Run shell commands through the session.
+        shell     (str): Shell executable.
+        proc    (Popen): Running shell or None.
+        marker    (str): Random end of command marker.
+        cwd       (str): Last known working directory of shell.
+    """
+
+    enabled = False
+    shell = r"/bin/sh"
+
+    proc = None
+    marker = None
+    cwd = None
+
+    @classmethod
+    def start(cls):
+        """Start shell coprocess.
+
+        The shell runs in its own process group, so a command that times out
+        is killed along with anything it spawned.
+        """
+
+        cls.marker = "__buildok_%s__" % uuid4().hex
+        cls.proc = Popen([cls.shell], stdin=PIPE, stdout=PIPE, stderr=STDOUT,
+                         close_fds=True, preexec_fn=setpgrp)
+        cls.cwd = None
+        Log.debug("Started shell session %s (PID %d)" % (
+            cls.shell, cls.proc.pid))
+
+    @classmethod
+    def execute(cls, cmd, timeout=None, on_line=None, capture=None):
+        """Run a command in the shell session.
+
+        Starts the session if it's not running. A command that exits the
+        shell or times out ends the session; the next command starts a new
+        one.
+
+        Args:
+            cmd        (str): Shell command line.
+            timeout  (float): Seconds before the session is killed. Defaults
+                              to the process runner timeout.
+            on_line (callable): Called with each output line as it arrives.
+            capture (Capture): Keeps output instead of memory.
+
+        Returns:
+            Result: Return code, output and timed out flag.
+        """
+
+        if cls.proc is None or cls.proc.poll() is not None:
+            cls.start()
+        if timeout is None:
+            timeout = Process.timeout
+        if on_line is None:
+            on_line = Process.log_line
+        script = ""
+        if cls.cwd != getcwd():
+            script += "cd -- %s\n" % quote(getcwd())
+        script += "eval %s </dev/null 2>&1\n" % quote(cmd)
+        script += "printf '\\n%%s %%d %%s\\n' %s " % cls.marker
+        script += "\"$?\" \"$PWD\"\n"
+        expired = []
+        timer = None
+        started = Trace.start()
+        if timeout is not None and timeout > 0:
+            timer = Timer(timeout, cls.expire, (expired,))
+            timer.daemon = True
+            timer.start()
+        lines, status, pending = [], None, b""
+        keep = lines.append if capture is None else capture.write
+        try:
+            cls.proc.stdin.write(script)
+            cls.proc.stdin.flush()
+            for line in Process.read_lines(cls.proc.stdout):
+                if line.startswith(cls.marker):
+                    status = line.rstrip("\n").split(" ", 2)
+                    break
+                # The line before marker ends with a newline added by the
+                # framing, so it's held back until the next line shows up
+                if len(pending) > 0:
+                    keep(pending)
+                pending = line
+                on_line(line)
+            if status is not None and pending.endswith("\n"):
+                pending = pending[:-1]
+            if len(pending) > 0:
+                keep(pending)
+        except IOError as e:
+            Log.debug("Shell session broken: %s" % e)
+        except BaseException:
+            cls.expire([])
+            cls.close()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+                timer.join()
+        Trace.finish(started, Process.describe(cmd), "process",
+                     pid=cls.proc.pid, session=True)
+        if capture is not None:
+            capture.close()
+            lines = [capture.get_tail()]
+        output = b"".join(lines)
+        if status is None:
+            returncode = cls.proc.wait()
+            cls.proc = None
+            return Process.Result(returncode, output, len(expired) > 0)
+        _, returncode, cls.cwd = status
+        if cls.cwd != getcwd():
+            Log.debug("Shell session changed directory: %s" % cls.cwd)
+            chdir(cls.cwd)
+        return Process.Result(int(returncode), output, False)
+
+    @classmethod
+    def expire(cls, expired):
+        """Kill the session after a timeout.
+
+        Args:
+            expired (list): Marked if the session was killed.
+        """
+
+        try:
+            killpg(cls.proc.pid, SIGKILL)
+            expired.append(True)
+        except (OSError, AttributeError):
+            pass
+
+    @classmethod
+    def close(cls):
+        """End shell coprocess.
+        """
+
+        if cls.proc is None:
+            return
+        if cls.proc.poll() is None:
+            try:
+                cls.proc.stdin.close()
+                cls.proc.wait()
+            except IOError:
+                killpg(cls.proc.pid, SIGKILL)
+                cls.proc.wait()
+            Log.debug("Closed shell session")
+        cls.proc = None
+        cls.cwd = None
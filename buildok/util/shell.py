@@ -27,8 +27,11 @@ class Shell(object):
     Attributes:
         parser (ArgumentParser): Argument parser.
         args             (dict): Dictionary of arguments.
+        ready            (bool): True once arguments are added to parser.
     """
 
+    ready = False
+
     parser = ArgumentParser(description="A tool to automate build steps")
     args = {
         ("-g", "--guide"): {
@@ -106,6 +109,108 @@ class Shell(object):
             "dest": "config_file",
             "help": "set path to configuration file"
         },
+        (None, "--parallel"): {
+            "action": "store",
+            "dest": "parallel",
+            "type": int,
+            "metavar": "N",
+            "help": "run independent steps on N parallel workers"
+        },
+        (None, "--timeout"): {
+            "action": "store",
+            "dest": "timeout",
+            "type": float,
+            "metavar": "SECONDS",
+            "help": "kill commands running longer than SECONDS"
+        },
+        (None, "--batch-install"): {
+            "action": "store_true",
+            "dest": "batch_install",
+            "help": "merge consecutive install steps into one transaction"
+        },
+        (None, "--persistent-shell"): {
+            "action": "store_true",
+            "dest": "persistent_shell",
+            "help": "run all shell commands of a topic in one shell session"
+        },
+        (None, "--output-tail"): {
+            "action": "store",
+            "dest": "output_tail",
+            "type": int,
+            "metavar": "N",
+            "help": "keep last N lines of command output, save rest to file"
+        },
+        (None, "--incremental"): {
+            "action": "store_true",
+            "dest": "incremental",
+            "help": "skip steps whose inputs have not changed since last run"
+        },
+        (None, "--resume"): {
+            "action": "store_true",
+            "dest": "resume",
+            "help": "continue last failed topic from the step that failed"
+        },
+        (None, "--run"): {
+            "action": "store",
+            "dest": "run_topics",
+            "metavar": "TOPICS",
+            "help": "run comma-separated topics without prompting"
+        },
+        (None, "--all"): {
+            "action": "store_true",
+            "dest": "run_all",
+            "help": "run all topics without prompting"
+        },
+        (None, "--report-json"): {
+            "action": "store",
+            "dest": "report_json",
+            "metavar": "PATH",
+            "help": "save report with step metrics to a JSON file"
+        },
+        (None, "--trace"): {
+            "action": "store",
+            "dest": "trace",
+            "metavar": "PATH",
+            "help": "save timeline of run in Chrome trace event format"
+        },
+        (None, "--history"): {
+            "action": "store_true",
+            "dest": "history",
+            "help": "show duration trends of steps from past runs"
+        },
+        (None, "--no-history"): {
+            "action": "store_true",
+            "dest": "no_history",
+            "help": "don't save run to history"
+        },
+        (None, "--regression-factor"): {
+            "action": "store",
+            "dest": "regression_factor",
+            "type": float,
+            "metavar": "FACTOR",
+            "help": "warn if a step runs FACTOR times slower than usual"
+        },
+        (None, "--serve"): {
+            "action": "store_true",
+            "dest": "serve",
+            "help": "keep running and serve guide runs over a unix socket"
+        },
+        (None, "--client"): {
+            "action": "store_true",
+            "dest": "client",
+            "help": "send run to daemon started with --serve"
+        },
+        (None, "--socket"): {
+            "action": "store",
+            "dest": "socket",
+            "metavar": "PATH",
+            "help": "set path to unix socket of daemon"
+        },
+        (None, "--no-cache"): {
+            "action": "store_true",
+            "dest": "no_cache",
+            "help": "don't use or save cached parsed guides"
+        },
         (None, "--placeholder"): {
             "action": "append",
             "dest": "placeholder",
@@ -114,17 +219,22 @@ class Shell(object):
     }
 
     @classmethod
-    def parse(cls):
+    def parse(cls, argv=None):
         """Create parser listener.
 
+        Args:
+            argv (list): Arguments to parse; defaults to shell arguments.
+
         Return:
             Namespace: Namespace of parser arguments from shell.
         """
 
-        for keys, vals in cls.args.iteritems():
-            short, long_ = keys
-            if short is None:
-                cls.parser.add_argument(long_, **vals)
-            else:
-                cls.parser.add_argument(short, long_, **vals)
-        return cls.parser.parse_args()
+        if not cls.ready:
+            for keys, vals in cls.args.iteritems():
+                short, long_ = keys
+                if short is None:
+                    cls.parser.add_argument(long_, **vals)
+                else:
+                    cls.parser.add_argument(short, long_, **vals)
+            cls.ready = True
+        return cls.parser.parse_args(argv)
@@ -0,0 +1,63 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+
+
+WORKING_DIR = os.getcwd()
+STATE_DIR = os.path.join(WORKING_DIR, ".buildok")
+
+
+def set_working_dir(folder):
+    """Keep state inside another working directory.
+
+    Used by long running processes serving builds of different projects.
+
+    Args:
+        folder (str): Working directory of project.
+
+    Returns:
+        str: Previous working directory.
+    """
+
+    global WORKING_DIR, STATE_DIR
+    previous = WORKING_DIR
+    WORKING_DIR = os.path.abspath(folder)
+    STATE_DIR = os.path.join(WORKING_DIR, ".buildok")
+    return previous
+
+
+def state_path(*names):
+    """Build a path inside buildok's state directory.
+
+    Creates missing parent directories of the returned path.
+
+    Args:
+        names (str): Path components relative to state directory.
+
+    Returns:
+        str: Absolute path inside state directory.
+    """
+
+    filepath = os.path.join(STATE_DIR, *names)
+    parent = os.path.dirname(filepath)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    return filepath
@@ -0,0 +1,143 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+import json
+
+from os import getpid
+from threading import current_thread
+from timeit import default_timer
+
+from buildok.util.log import Log
+
+
+class Trace(object):
+    """Timeline of a run in Chrome trace event format.
+
+    Spans are recorded as complete events and saved as a JSON file that
+    opens in chrome://tracing or Perfetto. Each thread gets its own track,
+    so steps on parallel workers show side by side.
+
+    Tracing is disabled by default; `start` then returns None and `finish`
+    returns right away, so instrumented code pays almost nothing.
+
+    Usage:
+
+        started = Trace.start()
+        ...
+        Trace.finish(started, "name", "category", key=value)
+
+    Attributes:
+        enabled (bool): Toggle recording of events.
+        origin (float): Timer value when tracing was enabled.
+        events  (list): Recorded trace events.
+        threads (dict): Thread idents mapped to track numbers.
+    """
+
+    enabled = False
+    origin = 0.0
+    events = []
+    threads = {}
+
+    @classmethod
+    def enable(cls):
+        """Start recording events.
+        """
+
+        cls.enabled = True
+        cls.origin = default_timer()
+        cls.events = []
+        cls.threads = {}
+
+    @classmethod
+    def start(cls):
+        """Begin a span.
+
+        Returns:
+            mixt: Timer value or None if tracing is disabled.
+        """
+
+        if not cls.enabled:
+            return None
+        return default_timer()
+
+    @classmethod
+    def finish(cls, started, name, category, **args):
+        """End a span and record it.
+
+        Args:
+            started (float): Value returned by start.
+            name      (str): Span name.
+            category  (str): Span category (e.g. guide, step, process).
+            args     (dict): Extra details displayed with span.
+        """
+
+        if started is None:
+            return
+        now = default_timer()
+        cls.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (started - cls.origin) * 1e6,
+            "dur": (now - started) * 1e6,
+            "pid": getpid(),
+            "tid": cls.get_track(),
+            "args": args,
+        })
+
+    @classmethod
+    def get_track(cls):
+        """Track number of current thread.
+
+        The first span of a thread also records the thread name.
+
+        Returns:
+            int: Track number.
+        """
+
+        thread = current_thread()
+        track = cls.threads.get(thread.ident)
+        if track is None:
+            track = cls.threads.setdefault(thread.ident, len(cls.threads) + 1)
+            cls.events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": getpid(),
+                "tid": track,
+                "args": {"name": thread.name},
+            })
+        return track
+
+    @classmethod
+    def save(cls, filepath):
+        """Save recorded events to file.
+
+        Args:
+            filepath (str): Path to trace file.
+        """
+
+        if not cls.enabled:
+            return
+        data = {"traceEvents": cls.events, "displayTimeUnit": "ms"}
+        try:
+            with open(filepath, "w") as file_:
+                json.dump(data, file_, default=str)
+            Log.info("Trace saved to %s" % filepath)
+        except Exception as e:
+            Log.warn("Cannot save trace: %s" % e)
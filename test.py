@@ -24,4 +24,4 @@ from test.tester import main
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from buildok.cache import Cache
+from buildok.structures.guide import Guide
+from buildok.structures.instruction import Instruction
+from buildok.structures.topic import Topic
+from buildok.util import state
+
+
+class CacheTest(unittest.TestCase):
+    """Guide cache keys, storage and invalidation.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.working_dir = state.set_working_dir(self.folder)
+        self.filepath = os.path.join(self.folder, "README.md")
+        self.write_guide("## how to build\n\n- Run `make`.\n")
+        Cache.enabled, Cache.memory = True, None
+
+    def tearDown(self):
+        Cache.enabled, Cache.memory = True, None
+        Topic.forget_all_topics()
+        state.set_working_dir(self.working_dir)
+        shutil.rmtree(self.folder)
+
+    def write_guide(self, content):
+        with open(self.filepath, "w") as file_:
+            file_.write(content)
+
+    def new_guide(self):
+        guide = Guide()
+        step = Instruction(3, "Run `make`", ".")
+        guide.add_topic(Topic(1, "build", [step]))
+        return guide
+
+    def test_digest_is_stable(self):
+        self.assertEqual(Cache.digest(self.filepath, [("a", "1")]),
+                         Cache.digest(self.filepath, [("a", "1")]))
+
+    def test_digest_changes_with_guide(self):
+        key = Cache.digest(self.filepath)
+        self.write_guide("## how to build\n\n- Run `make all`.\n")
+        self.assertNotEqual(key, Cache.digest(self.filepath))
+
+    def test_digest_changes_with_extra_values(self):
+        key = Cache.digest(self.filepath, [("a", "1")], None)
+        self.assertNotEqual(key, Cache.digest(self.filepath, [("a", "2")],
+                                              None))
+        self.assertNotEqual(key, Cache.digest(self.filepath, [("a", "1")],
+                                              r"## (?P<topic>\w+)"))
+
+    def test_digest_changes_with_revision(self):
+        key = Cache.digest(self.filepath)
+        revision = Cache.revision
+        Cache.revision += 1
+        try:
+            self.assertNotEqual(key, Cache.digest(self.filepath))
+        finally:
+            Cache.revision = revision
+
+    def test_save_and_load(self):
+        key = Cache.digest(self.filepath)
+        self.assertIsNone(Cache.load(key))
+        Cache.save(key, self.new_guide())
+        guide = Cache.load(key)
+        self.assertIsNotNone(guide)
+        topic = guide.get_topics()[0]
+        self.assertEqual(topic.get_title(), "build")
+        self.assertTrue(topic.has_step("run `make`"))
+
+    def test_changed_guide_misses(self):
+        Cache.save(Cache.digest(self.filepath), self.new_guide())
+        self.write_guide("## how to build\n\n- Run `make all`.\n")
+        self.assertIsNone(Cache.load(Cache.digest(self.filepath)))
+
+    def test_broken_entry_is_ignored(self):
+        key = Cache.digest(self.filepath)
+        with open(Cache.get_filepath(key), "wb") as file_:
+            file_.write(b"not a pickle")
+        self.assertIsNone(Cache.load(key))
+
+    def test_disabled_cache(self):
+        Cache.enabled = False
+        key = Cache.digest(self.filepath)
+        Cache.save(key, self.new_guide())
+        self.assertIsNone(Cache.load(key))
+        self.assertFalse(os.path.exists(os.path.join(
+            state.STATE_DIR, Cache.folder)))
+
+    def test_memory_drops_least_recently_used(self):
+        Cache.keep_in_memory(2)
+        guides = [self.new_guide() for _ in range(3)]
+        for key, guide in zip("abc", guides):
+            Cache.remember(key, guide)
+        self.assertEqual(list(Cache.memory), ["b", "c"])
+        self.assertIs(Cache.load("c"), guides[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
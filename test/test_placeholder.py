@@ -0,0 +1,108 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from buildok.placeholder import Placeholder
+from buildok.reader import Reader
+from buildok.readers.read_me import ReadmeReader
+from buildok.structures.topic import Topic
+
+
+GUIDE = """## how to build
+
+- Run `gcc -o <name> <source>`.
+- Run `echo <version>`.
+- Write to file `main.c`:
+```
+#include <stdio.h>
+int main() { puts("<greeting>"); }
+```
+"""
+
+
+class PlaceholderTest(unittest.TestCase):
+    """Placeholder substitution in strings and parsed guides.
+    """
+
+    def setUp(self):
+        Placeholder.reset()
+        Placeholder.config(["name=app", "greeting=hello"])
+        self.folder = tempfile.mkdtemp()
+        self.path = Reader.PATH
+
+    def tearDown(self):
+        Placeholder.reset()
+        Topic.forget_all_topics()
+        Reader.set_project_path(self.path)
+        shutil.rmtree(self.folder)
+
+    def parse(self, content):
+        filepath = os.path.join(self.folder, "README.md")
+        with open(filepath, "w") as file_:
+            file_.write(content)
+        Reader.set_project_path(filepath)
+        reader = ReadmeReader()
+        reader.read()
+        reader.parse()
+        return reader.get_guide()
+
+    def test_known_keys_are_replaced(self):
+        self.assertEqual(Placeholder.parse_string("cp <name> <name>.bak"),
+                         "cp app app.bak")
+
+    def test_longer_key_wins_over_prefix(self):
+        Placeholder.config(["name-dev=app-dev"])
+        self.assertEqual(Placeholder.parse_string("<name-dev> <name>"),
+                         "app-dev app")
+
+    def test_unknown_tokens_are_collected(self):
+        unresolved = set()
+        text = Placeholder.parse_string("<name> <source> <a b>", unresolved)
+        self.assertEqual(text, "app <source> <a b>")
+        self.assertEqual(unresolved, set(["source"]))
+
+    def test_scan_ignores_unknown_tokens(self):
+        self.assertTrue(Placeholder.scan_string("run <name>"))
+        self.assertFalse(Placeholder.scan_string("#include <stdio.h>"))
+
+    def test_guide_reports_steps_only(self):
+        guide = self.parse(GUIDE)
+        self.assertEqual(guide.get_unresolved(), ["source", "version"])
+
+    def test_payload_is_replaced_but_not_reported(self):
+        guide = self.parse(GUIDE)
+        steps = guide.get_topics()[0].get_steps()
+        self.assertEqual(steps[0].get_step(), "Run `gcc -o app <source>`")
+        self.assertEqual(steps[2].get_payload(),
+                         "#include <stdio.h>\n"
+                         "int main() { puts(\"hello\"); }")
+
+    def test_each_parse_starts_clean(self):
+        self.parse(GUIDE)
+        guide = self.parse("## how to build\n\n- Run `echo <name>`.\n")
+        self.assertEqual(guide.get_unresolved(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
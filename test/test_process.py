@@ -0,0 +1,91 @@
+# Copyright 2018 Alexandru Catrina
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import shutil
+import tempfile
+import unittest
+
+from subprocess import CalledProcessError
+from timeit import default_timer
+
+from buildok.util import state
+from buildok.util.capture import Capture
+from buildok.util.process import Process
+
+
+class ProcessTest(unittest.TestCase):
+    """Process runner: output, timeouts and children keeping output open.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.working_dir = state.set_working_dir(self.folder)
+
+    def tearDown(self):
+        state.set_working_dir(self.working_dir)
+        shutil.rmtree(self.folder)
+
+    def test_output_and_return_code(self):
+        lines = []
+        result = Process.run(["sh", "-c", "echo one; echo two >&2; exit 3"],
+                             on_line=lines.append)
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.output, b"one\ntwo\n")
+        self.assertEqual(lines, [b"one\n", b"two\n"])
+        self.assertFalse(result.timed_out)
+
+    def test_timeout_kills_child(self):
+        started = default_timer()
+        result = Process.run("sleep 10", shell=True, timeout=0.3)
+        self.assertTrue(result.timed_out)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertLess(default_timer() - started, 5)
+
+    def test_timeout_kills_grandchildren(self):
+        started = default_timer()
+        result = Process.run("sleep 10; sleep 10", shell=True, timeout=0.3)
+        self.assertTrue(result.timed_out)
+        self.assertLess(default_timer() - started, 5)
+
+    def test_check_output_raises_on_timeout(self):
+        with self.assertRaises(CalledProcessError) as ctx:
+            Process.check_output("sleep 10", shell=True, timeout=0.3)
+        self.assertIn("Timed out after 0.3s", ctx.exception.output)
+
+    def test_background_child_does_not_block(self):
+        started = default_timer()
+        result = Process.run("sleep 10 & echo started", shell=True,
+                             on_line=lambda line: None)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.output, b"started\n")
+        self.assertLess(default_timer() - started, Process.drain + 5)
+
+    def test_capture_keeps_tail(self):
+        capture = Capture("test", tail=2)
+        result = Process.run("seq 1 5", shell=True, capture=capture,
+                             on_line=lambda line: None)
+        self.assertEqual(result.output, b"4\n5\n")
+        self.assertEqual(capture.total, 5)
+        with open(capture.get_filepath(), "rb") as file_:
+            self.assertEqual(file_.read(), b"1\n2\n3\n4\n5\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,66 +18,249 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+
 from __future__ import print_function
 
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from StringIO import StringIO
+from timeit import default_timer
+from xml.etree import ElementTree
+
+from buildok.version import __version__
 from buildok.action import Action
+from buildok.matcher import Matcher
 from buildok.parser import Parser
 from buildok.statement import Statement
+from buildok.util.process import Process
+from buildok.util.shell import Shell
 from buildok.util.sysenv import Sysenv
 from buildok.structures.instruction import Instruction
 
 
-def main():
+# Samples write to /tmp; each test gets it replaced with its own sandbox
+SANDBOX_PATH = re.compile(r"/tmp\b")
 
-    # Load statemets
-    Statement.prepare()
+# Seconds before a command spawned by a sample is killed
+COMMAND_TIMEOUT = 60
+
+
+def setup():
+    """Prepare statements and system environment.
+
+    Done once in the main process; workers are forked and inherit it.
+    """
 
-    # Attach sysenv to actions
+    logging.disable(logging.CRITICAL)
+    Sysenv.setup(__version__, Shell.parse([]))
+    Statement.prepare()
     Action.set_env(Sysenv)
+    Process.set_timeout(COMMAND_TIMEOUT)
+
+
+def collect():
+    """Collect samples of all actions.
+
+    Returns:
+        list: Module, class name, description, sample input and expected
+              output of each action.
+    """
 
-    # Holder
-    not_testing = []
+    cases = []
+    for module, name, action in Statement.load_actions():
+        doc = unicode(action.__doc__)
+        data_in = Parser.lookahead(doc, "sample input")
+        data_out = Parser.lookahead(doc, "expected")
+        cases.append((module, name, action.parse_description(),
+                      [l.strip() for l in data_in],
+                      [l.strip() for l in data_out]))
+    return cases
 
-    # Loop all actions
-    for action in Statement.get_actions():
 
-        # Get name and description
-        action_name = action.__name__
-        action_desc = action.parse_description()
+def read_steps(lines):
+    """Build instructions from sample lines.
 
-        # Get input and output
-        data_in = Parser.lookahead(unicode(action.__doc__), "sample input")
-        data_out = Parser.lookahead(unicode(action.__doc__), "expected")
+    Args:
+        lines (list): Sample input lines.
 
-        # Avoid actions with no tests
-        if len(data_in) == 0:
-            not_testing.append((action_name, action_desc))
+    Returns:
+        list: List of instructions, with payload if any.
+    """
+
+    steps, payload = [], None
+    for line in lines:
+        if payload is not None:
+            if line == "```" and len(payload) > 0:
+                steps[-1].set_payload(payload[1:])
+                payload = None
+            else:
+                payload.append(line)
+            continue
+        scan = Instruction.PATTERN.match(line)
+        if scan is None:
             continue
+        step = Instruction(len(steps), scan.group("step"), scan.group("punct"))
+        steps.append(step)
+        if step.get_punctuation() == Instruction.RunType.ARGS:
+            payload = []
+    return steps
+
 
-        # Validate action
-        print("Testing... %s (%s)" % (action_name, action_desc))
+def run_case(case):
+    """Run samples of an action in a sandbox and compare output.
 
-        for line in data_in:
-            print(" " * 10, line.strip())
+    Each case runs in a fresh temporary directory, with paths to /tmp from
+    samples and expected output pointed to it. Anything printed by actions
+    is kept in the case log.
 
-            scan = Instruction.PATTERN.match(line.strip())
-            if scan is None:
-                continue
-            step = Instruction(0, scan.group("step"), scan.group("punct"))
+    Args:
+        case (tuple): Case as returned by collect.
 
-            for exp, handler in Statement.get_statements():
-                args = exp.match(step.get_step())
-                if args is not None:
-                    fun = handler()
-                    fun.run(**args.groupdict())
-                    print(fun.get_output())
-                    break
+    Returns:
+        dict: Outcome of case, with message and log.
+    """
 
-        for line in data_out:
-            print("Results...", line.strip())
-        print("\n")
+    module, name, description, data_in, data_out = case
+    result = {"module": module, "name": name, "description": description,
+              "outcome": "passed", "message": "", "log": [], "time": 0.0}
+    if len(data_in) == 0:
+        result.update({"outcome": "skipped", "message": "No samples"})
+        return result
+    started = default_timer()
+    cwd, stdout = os.getcwd(), sys.stdout
+    sandbox = tempfile.mkdtemp(prefix="buildok-test-")
+    try:
+        os.chdir(sandbox)
+        sys.stdout = StringIO()
+        lines = [SANDBOX_PATH.sub(sandbox, l) for l in data_in]
+        expected = [SANDBOX_PATH.sub(sandbox, l) for l in data_out]
+        output = None
+        for step in read_steps(lines):
+            result["log"].append(step.get_step())
+            if not Matcher.pair_one(step):
+                raise ValueError("Unsupported step: %s" % step.get_step())
+            success, output = step.run()
+            printed = sys.stdout.getvalue()
+            sys.stdout.truncate(0)
+            result["log"].extend(unicode(printed).splitlines())
+            result["log"].append(unicode(output))
+            if not success:
+                result.update({"outcome": "failed",
+                               "message": u"Step failed: %s" % output})
+                break
+        else:
+            actual = unicode(output).strip().splitlines()[:len(expected)]
+            if actual != expected:
+                result.update({"outcome": "failed", "message": u"%r != %r" % (
+                    u"\n".join(actual), u"\n".join(expected))})
+    except Exception as e:
+        result.update({"outcome": "error", "message": unicode(e)})
+    finally:
+        sys.stdout = stdout
+        os.chdir(cwd)
+        shutil.rmtree(sandbox, ignore_errors=True)
+    result["time"] = default_timer() - started
+    return result
+
+
+def write_junit(results, filepath, runtime):
+    """Save results as JUnit XML.
+
+    Args:
+        results  (list): Outcome of each case.
+        filepath  (str): Path to report file.
+        runtime (float): Runtime of all cases in seconds.
+    """
+
+    outcomes = [r["outcome"] for r in results]
+    suite = ElementTree.Element("testsuite", {
+        "name": "buildok.statements",
+        "tests": str(len(results)),
+        "failures": str(outcomes.count("failed")),
+        "errors": str(outcomes.count("error")),
+        "skipped": str(outcomes.count("skipped")),
+        "time": "%.3f" % runtime,
+    })
+    for result in results:
+        case = ElementTree.SubElement(suite, "testcase", {
+            "classname": result["module"],
+            "name": result["name"],
+            "time": "%.3f" % result["time"],
+        })
+        if result["outcome"] == "failed":
+            tag = "failure"
+        elif result["outcome"] == "error":
+            tag = "error"
+        elif result["outcome"] == "skipped":
+            tag = "skipped"
+        else:
+            tag = None
+        if tag is not None:
+            node = ElementTree.SubElement(case, tag)
+            node.set("message", result["message"])
+        if len(result["log"]) > 0:
+            log = ElementTree.SubElement(case, "system-out")
+            log.text = u"\n".join(result["log"])
+    ElementTree.ElementTree(suite).write(filepath, "utf-8", True)
+
+
+def main():
+    parser = ArgumentParser(description="Run samples of all statements")
+    parser.add_argument("--workers", type=int, default=cpu_count(),
+                        help="number of parallel worker processes")
+    parser.add_argument("--junit-xml", dest="junit_xml", metavar="PATH",
+                        help="save results as JUnit XML")
+    args = parser.parse_args()
+
+    # Load statements and system environment
+    setup()
+
+    # Run all cases on a pool of workers
+    cases = collect()
+    started = default_timer()
+    workers = max(1, min(args.workers, len(cases)))
+    pool = Pool(workers)
+    try:
+        results = pool.map(run_case, cases, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    runtime = default_timer() - started
+
+    # Print results in order
+    for result in results:
+        if result["outcome"] == "skipped":
+            continue
+        print("Testing... %s (%s)" % (result["name"], result["description"]))
+        for line in result["log"]:
+            print(" " * 10, line)
+        print("Result... %s %s" % (result["outcome"].upper(),
+                                   result["message"]))
+        print("")
 
     # Print actions with no tests
     print("-" * 10, "\nNot tested...")
-    for each in not_testing:
-        print(" - %s (%s)" % each)
+    for result in results:
+        if result["outcome"] == "skipped":
+            print(" - %s (%s)" % (result["name"], result["description"]))
+
+    outcomes = [r["outcome"] for r in results]
+    print("-" * 10)
+    print("Ran %d cases in %.2fs on %d workers: %d passed, %d failed, "
+          "%d errors, %d skipped" % (
+              len(results), runtime, workers, outcomes.count("passed"),
+              outcomes.count("failed"), outcomes.count("error"),
+              outcomes.count("skipped")))
+
+    if args.junit_xml is not None:
+        write_junit(results, args.junit_xml, runtime)
+        print("JUnit report saved to %s" % args.junit_xml)
+
+    return 1 if "failed" in outcomes or "error" in outcomes else 0